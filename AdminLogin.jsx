@@ -207,7 +207,7 @@ function AdminLogin() {
 
         if (response.ok) {
           const data = await response.json();
-          alert(`${data.message}\nUsers notified: ${data.users_notified || 'N/A'}`);
+          alert(`${data.message}\nAnnouncement: ${data.announcement_id || 'N/A'}`);
           setMessage('');
           setMessageTitle('');
         }
@@ -7,6 +7,7 @@ import '../styles/Dashboard.css';
 
 function AllProfiles() {
   const [profiles, setProfiles] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [currentUserProfile, setCurrentUserProfile] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -18,7 +19,15 @@ function AllProfiles() {
   useEffect(() => {
     fetchAllProfiles();
     fetchCurrentUserProfile();
-    fetchUnreadNotificationCount();
+    
+    // The server pushes the unread count on connect and whenever it changes
+    const source = new EventSource('http://localhost:5000/notifications/stream', { withCredentials: true });
+    source.addEventListener('unread_count', (event) => {
+      setUnreadNotificationCount(JSON.parse(event.data).unread_count || 0);
+    });
+    // Sent when this connection fell behind and events were dropped
+    source.addEventListener('resync', fetchUnreadNotificationCount);
+    return () => source.close();
   }, []);
 
   const fetchUnreadNotificationCount = async () => {
@@ -36,15 +45,18 @@ function AllProfiles() {
     }
   };
 
-  const fetchAllProfiles = async () => {
+  const fetchAllProfiles = async (cursor = null) => {
     try {
-      const response = await fetch('http://localhost:5000/all-profiles', {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`http://localhost:5000/all-profiles${query}`, {
         credentials: 'include'
       });
       
       if (response.ok) {
         const data = await response.json();
-        setProfiles(data.profiles || []);
+        const page = data.profiles || [];
+        setProfiles(prev => (cursor ? [...prev, ...page] : page));
+        setNextCursor(data.next_cursor || null);
       } else {
         setError('Failed to fetch profiles');
       }
@@ -186,6 +198,12 @@ function AllProfiles() {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <button onClick={() => fetchAllProfiles(nextCursor)} className="view-all-btn">
+            Load more
+          </button>
+        )}
       </div>
 
       {/* Notifications Modal */}
@@ -5,33 +5,129 @@ function Chat({ requestId, recipientName, onClose }) {
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState('');
   const [loading, setLoading] = useState(true);
+  const [beforeId, setBeforeId] = useState(null);
+  const [loadingOlder, setLoadingOlder] = useState(false);
   const messagesEndRef = useRef(null);
+  const lastMessageIdRef = useRef(null);
+  const newestShownIdRef = useRef(null);
+
+  const appendMessages = useCallback((incoming) => {
+    if (incoming.length === 0) return;
+    lastMessageIdRef.current = Math.max(lastMessageIdRef.current ?? 0, ...incoming.map((m) => m.id));
+    setMessages((prev) => {
+      // Pushed and fetched copies of a message can overlap; skip messages we already have
+      const known = new Set(prev.map((m) => m.id));
+      return [...prev, ...incoming.filter((m) => !known.has(m.id))];
+    });
+  }, []);
 
   const fetchMessages = useCallback(async () => {
     try {
-      const response = await fetch(`http://localhost:5000/chat/${requestId}`, {
+      // After the first load, only ask for messages newer than the last one we have
+      let afterId = lastMessageIdRef.current;
+      let hasMore = true;
+      while (hasMore) {
+        const query = afterId !== null ? `?after_id=${afterId}` : '';
+        const response = await fetch(`http://localhost:5000/chat/${requestId}${query}`, {
+          credentials: 'include'
+        });
+        
+        // 204: nothing new since afterId
+        if (!response.ok || response.status === 204) break;
+        const data = await response.json();
+        const incoming = data.messages || [];
+        if (afterId === null) {
+          // First load is the newest page; older pages are fetched on demand
+          setBeforeId(data.before_id ?? null);
+        }
+        appendMessages(incoming);
+        // A full catch-up page: keep going from its last message until the gap is closed
+        hasMore = afterId !== null && Boolean(data.has_more) && incoming.length > 0;
+        if (hasMore) afterId = incoming[incoming.length - 1].id;
+      }
+    } catch (error) {
+      console.error('Error fetching messages:', error);
+    } finally {
+      setLoading(false);
+    }
+  }, [requestId, appendMessages]);
+
+  const loadOlderMessages = async () => {
+    if (beforeId === null || loadingOlder) return;
+    setLoadingOlder(true);
+    try {
+      const response = await fetch(`http://localhost:5000/chat/${requestId}?before_id=${beforeId}`, {
         credentials: 'include'
       });
       
       if (response.ok) {
         const data = await response.json();
-        setMessages(data.messages || []);
+        const older = data.messages || [];
+        setMessages((prev) => {
+          const known = new Set(prev.map((m) => m.id));
+          return [...older.filter((m) => !known.has(m.id)), ...prev];
+        });
+        setBeforeId(data.before_id ?? null);
       }
     } catch (error) {
-      console.error('Error fetching messages:', error);
+      console.error('Error loading older messages:', error);
     } finally {
-      setLoading(false);
+      setLoadingOlder(false);
     }
-  }, [requestId]);
+  };
 
-  useEffect(() => {
+  const reloadMessages = useCallback(() => {
+    lastMessageIdRef.current = null;
+    newestShownIdRef.current = null;
+    setMessages([]);
+    setBeforeId(null);
     fetchMessages();
-    const interval = setInterval(fetchMessages, 3000);
-    return () => clearInterval(interval);
   }, [fetchMessages]);
 
   useEffect(() => {
-    scrollToBottom();
+    reloadMessages();
+
+    // New messages are pushed by the real-time server to this conversation's room
+    let socket = null;
+    let retryTimer = null;
+    let closed = false;
+    const connect = () => {
+      socket = new WebSocket('ws://localhost:6789');
+      socket.onopen = () => {
+        socket.send(JSON.stringify({ type: 'subscribe', request_id: requestId }));
+      };
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'message') {
+          appendMessages([data.message]);
+        } else if (data.type === 'subscribed') {
+          // Catch up on anything sent while we were not subscribed
+          fetchMessages();
+        } else if (data.type === 'resync') {
+          // The server dropped pushes we were too slow for; start again from the newest page
+          reloadMessages();
+        }
+      };
+      socket.onclose = () => {
+        if (!closed) retryTimer = setTimeout(connect, 3000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      socket.close();
+    };
+  }, [requestId, fetchMessages, appendMessages, reloadMessages]);
+
+  useEffect(() => {
+    // Follow new messages, but stay put when older ones are prepended
+    const newestId = messages.length > 0 ? messages[messages.length - 1].id : null;
+    if (newestId !== newestShownIdRef.current) {
+      newestShownIdRef.current = newestId;
+      scrollToBottom();
+    }
   }, [messages]);
 
   const sendMessage = async (e) => {
@@ -94,6 +190,11 @@ function Chat({ requestId, recipientName, onClose }) {
         </div>
         
         <div className="chat-messages">
+          {beforeId !== null && (
+            <button className="load-older-btn" onClick={loadOlderMessages} disabled={loadingOlder}>
+              {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+            </button>
+          )}
           {messages.length === 0 ? (
             <div className="no-messages">
               <p>Start your conversation! 👋</p>
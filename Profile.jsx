@@ -4,6 +4,7 @@ import '../styles/Profile.css';
 
 function Profile() {
   const [skills, setSkills] = useState([]);
+  const [skillQuery, setSkillQuery] = useState('');
   const [newSkill, setNewSkill] = useState('');
   const [offeredSkills, setOfferedSkills] = useState([]);
   const [wantedSkills, setWantedSkills] = useState([]);
@@ -17,10 +18,15 @@ function Profile() {
   const proficiencyLevels = ['beginner', 'intermediate', 'advanced', 'expert'];
 
   useEffect(() => {
-    fetchSkills();
     loadUserProfile();
   }, []);
 
+  useEffect(() => {
+    // Debounce so each keystroke doesn't fire its own request
+    const timer = setTimeout(() => fetchSkills(skillQuery), 200);
+    return () => clearTimeout(timer);
+  }, [skillQuery]);
+
   useEffect(() => {
     // Check if profile is complete
     const hasSkills = offeredSkills.length > 0 || wantedSkills.length > 0;
@@ -45,9 +51,9 @@ function Profile() {
     }
   };
 
-  const fetchSkills = async () => {
+  const fetchSkills = async (query = '') => {
     try {
-      const response = await fetch('http://localhost:5000/skills', {
+      const response = await fetch(`http://localhost:5000/skills/autocomplete?q=${encodeURIComponent(query)}&limit=25`, {
         credentials: 'include' // Include cookies/session
       });
       const data = await response.json();
@@ -70,7 +76,7 @@ function Profile() {
       
       if (response.ok) {
         setNewSkill('');
-        fetchSkills();
+        fetchSkills(skillQuery);
         alert('Skill added successfully!');
       } else {
         const errorData = await response.json();
@@ -231,6 +237,16 @@ function Profile() {
         </div>
       </div>
 
+      {/* Skill search */}
+      <div className="section">
+        <input
+          type="text"
+          value={skillQuery}
+          onChange={(e) => setSkillQuery(e.target.value)}
+          placeholder="Search skills"
+        />
+      </div>
+
       {/* Skills I Can Offer */}
       <div className="section">
         <h3>Skills I Can Offer</h3>
@@ -0,0 +1,16 @@
+-- Platform-wide announcements: one row per broadcast, merged into /notifications
+-- at read time for users whose last-seen watermark is below it
+CREATE TABLE IF NOT EXISTS announcements (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    message TEXT,
+    created_by INT DEFAULT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE user_notification_stats
+ADD COLUMN last_seen_announcement_id INT NOT NULL DEFAULT 0;
+
+-- Broadcasts no longer fan out into notifications, so the fan-out job table
+-- goes; an announcement's reach is reported by /admin/announcements/<id>
+DROP TABLE IF EXISTS broadcast_jobs;
@@ -0,0 +1,20 @@
+-- Packed weekly availability: bit (day_index * 4 + slot_index), where day_index
+-- follows Monday..Sunday and slot_index follows Morning, Afternoon, Evening, Night
+ALTER TABLE users
+ADD COLUMN availability_mask INT UNSIGNED NOT NULL DEFAULT 0;
+
+-- Backfill from the existing availability rows
+UPDATE users u
+JOIN (
+    SELECT user_id,
+           BIT_OR(1 << ((FIELD(day, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday') - 1) * 4
+                        + FIELD(time_slot, 'Morning', 'Afternoon', 'Evening', 'Night') - 1)) AS mask
+    FROM availability
+    WHERE FIELD(day, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday') > 0
+      AND FIELD(time_slot, 'Morning', 'Afternoon', 'Evening', 'Night') > 0
+    GROUP BY user_id
+) a ON a.user_id = u.id
+SET u.availability_mask = a.mask;
+
+-- Snapshots now render availability from the mask; rebuild them afterwards with:
+--   python profile_snapshots.py
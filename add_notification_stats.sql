@@ -0,0 +1,14 @@
+-- Per-user unread notification counters, changed in the same transaction as
+-- notification inserts and mark-read updates (a missing row means zero).
+-- The initial backfill below can be repeated at any time to repair drift with:
+--   python notification_stats.py
+CREATE TABLE IF NOT EXISTS user_notification_stats (
+    user_id INT PRIMARY KEY,
+    unread_count INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+INSERT INTO user_notification_stats (user_id, unread_count)
+SELECT user_id, COUNT(*) FROM notifications WHERE is_read = FALSE GROUP BY user_id
+ON DUPLICATE KEY UPDATE unread_count = VALUES(unread_count);
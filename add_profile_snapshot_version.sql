@@ -0,0 +1,4 @@
+-- Version counter bumped on every snapshot rebuild; the in-process profile
+-- cache tags encoded fragments with it so workers never serve a stale profile
+ALTER TABLE profile_snapshots
+ADD COLUMN version INT NOT NULL DEFAULT 1;
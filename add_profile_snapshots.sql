@@ -0,0 +1,13 @@
+-- Denormalized, ready-to-serve profile documents (one row per user)
+-- Rebuilt in the same transaction as every profile write; backfill with:
+--   python profile_snapshots.py
+CREATE TABLE IF NOT EXISTS profile_snapshots (
+    user_id INT PRIMARY KEY,
+    is_public BOOLEAN NOT NULL DEFAULT TRUE,
+    has_skills BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NULL,
+    document JSON NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_snapshot_listing (is_public, has_skills, created_at, user_id)
+);
@@ -0,0 +1,29 @@
+-- Store email verification and password reset tokens as SHA-256 hashes under a
+-- unique index: the emailed plaintext never reaches the database, and consuming
+-- a token is a single indexed conditional UPDATE (see auth_service.py)
+ALTER TABLE email_verification_tokens
+ADD COLUMN token_hash CHAR(64) NULL AFTER user_id;
+
+UPDATE email_verification_tokens SET token_hash = SHA2(token, 256);
+
+ALTER TABLE email_verification_tokens
+MODIFY token_hash CHAR(64) NOT NULL,
+ADD UNIQUE INDEX idx_token_hash (token_hash),
+DROP COLUMN token;
+
+ALTER TABLE password_reset_tokens
+ADD COLUMN token_hash CHAR(64) NULL AFTER user_id;
+
+UPDATE password_reset_tokens SET token_hash = SHA2(token, 256);
+
+ALTER TABLE password_reset_tokens
+MODIFY token_hash CHAR(64) NOT NULL,
+ADD UNIQUE INDEX idx_token_hash (token_hash),
+DROP COLUMN token;
+
+-- Legacy copies on users hold the hash too
+UPDATE users SET email_verification_token = SHA2(email_verification_token, 256)
+WHERE email_verification_token IS NOT NULL;
+
+UPDATE users SET password_reset_token = SHA2(password_reset_token, 256)
+WHERE password_reset_token IS NOT NULL;
@@ -7,19 +7,21 @@ from flask_cors import CORS
 import re
 import datetime
 from functools import wraps
+from db_pool import DB_CONFIG, get_pool
+from profile_snapshots import rebuild_profile_snapshot, rebuild_profile_snapshots, skill_user_ids
+from profile_cache import profile_cache
+from table_versions import table_versions
+from user_search import user_search_index
+from announcements import create_announcement, get_announcement_status
+from notification_hub import notification_hub
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app, origins=['http://localhost:3000'], supports_credentials=True)
 
-# Configuration from environment variables (dynamic values)
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'user': os.getenv('DB_USER', 'root'),
-    'password': os.getenv('DB_PASSWORD', 'ShreeKrishna@7'),
-    'database': os.getenv('DB_NAME', 'skill_swap')
-}
+SEARCH_PAGE_SIZE_DEFAULT = 20
+SEARCH_PAGE_SIZE_MAX = 50
 
 # Data validation functions
 def validate_email(email):
@@ -62,9 +64,9 @@ def handle_errors(f):
             }), 500
     return decorated_function
 
-# Database connection with connection pooling
+# Database connection with connection pooling (shared with app.py and AuthService)
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    return get_pool(DB_CONFIG).get_connection()
 
 @app.route('/admin/login', methods=['POST'])
 @handle_errors
@@ -278,8 +280,13 @@ def reject_skill():
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        # The delete cascades to user_skills_offered / user_skills_wanted: rebuild those users' snapshots with it
+        affected_users = skill_user_ids(cursor, skill_id)
         cursor.execute("DELETE FROM skills WHERE id = %s", (skill_id,))
+        rebuild_profile_snapshots(cursor, affected_users)
         conn.commit()
+        profile_cache.evict(affected_users)
+        table_versions.bump('skills', 'profiles')
         return jsonify({'message': 'Skill rejected successfully'})
     except Exception as e:
         return jsonify({'message': 'Error rejecting skill', 'error': str(e)}), 500
@@ -296,7 +303,10 @@ def ban_user():
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET name = CONCAT(name, ' (BANNED)') WHERE id = %s", (user_id,))
+        rebuild_profile_snapshot(cursor, user_id)
         conn.commit()
+        profile_cache.evict([user_id])
+        table_versions.bump('profiles', 'users')
         return jsonify({'message': 'User banned successfully'})
     except Exception as e:
         return jsonify({'message': 'Error banning user', 'error': str(e)}), 500
@@ -317,33 +327,23 @@ def send_message():
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Get all active users
-        cursor.execute("SELECT id FROM users WHERE name NOT LIKE '%BANNED%'")
-        users = cursor.fetchall()
-        
-        if not users:
-            return jsonify({'message': 'No active users found'}), 404
-        
-        # Send notification to each user
-        for user in users:
-            user_id = user[0]
-            cursor.execute("""
-                INSERT INTO notifications (user_id, type, title, message, is_read, created_at)
-                VALUES (%s, 'message', %s, %s, FALSE, NOW())
-            """, (user_id, title, message))
+        # One announcements row regardless of user count; users see it through their watermark
+        announcement_id = create_announcement(cursor, title, message, admin_id=1)
         
         # Log admin action
         cursor.execute("""
             INSERT INTO admin_logs (action, user_id, created_at) 
             VALUES (%s, %s, NOW())
-        """, (f"Sent broadcast message to {len(users)} users: {message}", 1))
+        """, (f"Published announcement {announcement_id}: {message}", 1))
         
         conn.commit()
+        notification_hub.publish_announcement(announcement_id)
         
         return jsonify({
-            'message': f'Broadcast message sent successfully to {len(users)} users',
-            'users_notified': len(users)
-        })
+            'message': 'Broadcast message published',
+            'announcement_id': announcement_id,
+            'status_url': f'/admin/announcements/{announcement_id}'
+        }), 201
         
     except Exception as e:
         return jsonify({'message': 'Error sending broadcast message', 'error': str(e)}), 500
@@ -351,6 +351,21 @@ def send_message():
         if 'conn' in locals():
             conn.close()
 
+@app.route('/admin/announcements/<int:announcement_id>', methods=['GET'])
+@app.route('/admin/broadcast_jobs/<int:announcement_id>', methods=['GET'])
+@handle_errors
+def announcement_status(announcement_id):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        announcement = get_announcement_status(cursor, announcement_id)
+        cursor.close()
+    finally:
+        conn.close()
+    if not announcement:
+        return jsonify({'message': 'Announcement not found'}), 404
+    return jsonify({'announcement': announcement})
+
 @app.route('/admin/download_reports', methods=['GET'])
 def download_reports():
     try:
@@ -386,53 +401,31 @@ def download_reports():
 @app.route('/api/users/search', methods=['GET'])
 @handle_errors
 def search_users():
+    """Search users by name, email or skill through the in-memory inverted index, one ranked page at a time"""
     search_term = request.args.get('q', '').strip()
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_SIZE_DEFAULT))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'Validation error', 'message': 'limit and offset must be integers'}), 400
+    limit = max(1, min(limit, SEARCH_PAGE_SIZE_MAX))
+    offset = max(0, offset)
     
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     
     try:
-        if search_term:
-            # Search in users table and skills table
-            cursor.execute("""
-                SELECT DISTINCT u.id, u.name, u.email, 
-                       GROUP_CONCAT(s.name) as skills
-                FROM users u
-                LEFT JOIN skills s ON u.id = s.user_id
-                WHERE u.name LIKE %s 
-                   OR u.email LIKE %s 
-                   OR s.name LIKE %s
-                GROUP BY u.id, u.name, u.email
-                ORDER BY u.name
-            """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-        else:
-            # Get all users with their skills
-            cursor.execute("""
-                SELECT u.id, u.name, u.email, 
-                       GROUP_CONCAT(s.name) as skills
-                FROM users u
-                LEFT JOIN skills s ON u.id = s.user_id
-                GROUP BY u.id, u.name, u.email
-                ORDER BY u.name
-            """)
-        
-        users = cursor.fetchall()
-        
-        # Format skills as arrays
-        for user in users:
-            if user['skills']:
-                user['skills'] = user['skills'].split(',')
-            else:
-                user['skills'] = []
-        
-        return jsonify({'users': users})
-        
+        # Picks up users and skills written by any worker since the last sync (no-op if none)
+        user_search_index.sync(cursor)
     except Exception as e:
         return jsonify({'users': [], 'error': str(e)}), 500
     finally:
         if conn.is_connected():
             cursor.close()
             conn.close()
+    
+    users, next_offset = user_search_index.search(search_term, limit, offset)
+    return jsonify({'users': users, 'next_offset': next_offset})
 
 @app.route('/api/user/<int:user_id>/skills', methods=['GET'])
 @handle_errors
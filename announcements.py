@@ -0,0 +1,107 @@
+# Announcements
+# Platform-wide messages stored once and merged into each user's notifications at read time
+
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Each user has a last-seen announcement watermark (user_notification_stats);
+# announcements above it are unread. A missing row means a watermark of zero.
+# Banned users never see announcements (filtered here, at read time).
+
+# Banned users are marked by a name suffix (see ban_user)
+BANNED_NAME_PATTERN = '%BANNED%'
+
+def banned_user_ids(cursor, user_ids: Iterable[int]) -> Set[int]:
+    """The banned users among user_ids, who get no announcements"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    cursor.execute(f"SELECT id FROM users WHERE id IN ({placeholders}) AND name LIKE %s",
+                   user_ids + [BANNED_NAME_PATTERN])
+    return {row[0] for row in cursor.fetchall()}
+
+def create_announcement(cursor, title: str, message: str, admin_id: Optional[int] = None) -> int:
+    """Publish an announcement to every user with a single row; returns its id"""
+    cursor.execute("""
+        INSERT INTO announcements (title, message, created_by) VALUES (%s, %s, %s)
+    """, (title, message, admin_id))
+    return cursor.lastrowid
+
+def get_announcement_status(cursor, announcement_id: int) -> Optional[Dict[str, Any]]:
+    """Reach of an announcement so far, or None if it does not exist.
+
+    An announcement is delivered when a user reads it, so progress counts the
+    non-banned users who existed when it was published and whose watermark has
+    reached it (new users start past it and are not counted). The counts scan
+    users, which is fine for an admin status view.
+    """
+    cursor.execute("""
+        SELECT id, title, created_at, NOW() FROM announcements WHERE id = %s
+    """, (announcement_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    _, title, created_at, now = row
+
+    cursor.execute("""
+        SELECT COUNT(*), COALESCE(SUM(s.last_seen_announcement_id >= %s), 0)
+        FROM users u
+        LEFT JOIN user_notification_stats s ON s.user_id = u.id
+        WHERE u.name NOT LIKE %s AND u.created_at <= %s
+    """, (announcement_id, BANNED_NAME_PATTERN, created_at))
+    total_users, seen_users = cursor.fetchone()
+    seen_users = int(seen_users)
+
+    elapsed = (now - created_at).total_seconds() if created_at else 0
+    return {
+        'id': announcement_id,
+        'title': title,
+        'status': 'published',
+        'created_at': created_at.isoformat() if created_at else None,
+        'total_users': total_users,
+        'seen_users': seen_users,
+        'progress': round(seen_users / total_users, 4) if total_users else 1.0,
+        'elapsed_seconds': elapsed,
+        'users_per_second': round(seen_users / elapsed, 1) if elapsed > 0 else None
+    }
+
+def start_announcement_watermark(cursor, user_id: int) -> None:
+    """Give a new user a watermark at the newest announcement, so earlier ones never show up"""
+    cursor.execute("""
+        INSERT INTO user_notification_stats (user_id, unread_count, last_seen_announcement_id)
+        SELECT %s, 0, COALESCE(MAX(id), 0) FROM announcements
+        ON DUPLICATE KEY UPDATE last_seen_announcement_id = VALUES(last_seen_announcement_id)
+    """, (user_id,))
+
+def mark_announcements_seen(cursor, user_id: int, through_id: Optional[int] = None) -> None:
+    """Advance the user's watermark to through_id (default: the newest announcement); never moves back"""
+    if through_id is None:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM announcements")
+        through_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO user_notification_stats (user_id, unread_count, last_seen_announcement_id)
+        VALUES (%s, 0, %s)
+        ON DUPLICATE KEY UPDATE last_seen_announcement_id = GREATEST(last_seen_announcement_id, VALUES(last_seen_announcement_id))
+    """, (user_id, through_id))
+
+def unseen_announcements(cursor, user_id: int, limit: int) -> List[Dict[str, Any]]:
+    """Newest announcements above the user's watermark, shaped like notification rows"""
+    cursor.execute("""
+        SELECT a.id, a.title, a.message, a.created_at
+        FROM announcements a
+        JOIN users u ON u.id = %s AND u.name NOT LIKE %s
+        WHERE a.id > COALESCE((
+            SELECT last_seen_announcement_id FROM user_notification_stats WHERE user_id = u.id
+        ), 0)
+        ORDER BY a.id DESC
+        LIMIT %s
+    """, (user_id, BANNED_NAME_PATTERN, limit))
+    return [{
+        'id': f'announcement-{announcement_id}',
+        'type': 'announcement',
+        'title': title,
+        'message': message,
+        'is_read': False,
+        'related_request_id': None,
+        'created_at': created_at.isoformat() if created_at else None
+    } for announcement_id, title, message, created_at in cursor.fetchall()]
@@ -1,8 +1,11 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, request, jsonify, session
 from flask_cors import CORS
 import mysql.connector
 import bcrypt
 import os
+import base64
+import json
+from datetime import datetime
 from dotenv import load_dotenv
 from validators import validate_user_data, UserValidator
 from auth_service import AuthService
@@ -10,6 +13,24 @@ from error_handling import (
     handle_errors, validate_request_data, log_user_action,
     SkillSwapException, ValidationException, AuthenticationException
 )
+from db_pool import DB_CONFIG, get_pool
+from profile_snapshots import (
+    rebuild_profile_snapshot, rebuild_profile_snapshots, skill_user_ids,
+    load_profile_snapshot, to_listing_profile
+)
+from profile_cache import profile_cache
+from table_versions import table_versions
+from skill_matching import skill_match_index
+from availability import availability_index, slot_bit, shared_slot_count
+from skill_autocomplete import skill_autocomplete
+from notification_hub import notification_hub, parse_event_id
+from notification_stats import record_unread, record_read, clear_unread, get_unread_count
+from announcements import (
+    create_announcement, get_announcement_status, mark_announcements_seen, unseen_announcements
+)
+from request_cache import swap_request_cache
+from password_hashing import password_hasher
+from realtime_events import publish_chat_message, publish_notification, publish_request_status
 
 # Load environment variables
 load_dotenv()
@@ -19,20 +40,38 @@ app = Flask(__name__)
 CORS(app, supports_credentials=True, origins=['http://localhost:3000'])
 app.secret_key = os.getenv('SECRET_KEY', 'your_secret_key_change_in_production')
 
-# Database configuration
-DB_CONFIG = {
-    "host": os.getenv('DB_HOST', "localhost"),
-    "user": os.getenv('DB_USER', "root"),
-    "password": os.getenv('DB_PASSWORD', "ShreeKrishna@7"),
-    "database": os.getenv('DB_NAME', "skill_swap")
-}
+# Profile listing page sizes (server-enforced)
+PROFILE_PAGE_SIZE_DEFAULT = int(os.getenv('PROFILE_PAGE_SIZE_DEFAULT', 20))
+PROFILE_PAGE_SIZE_MAX = int(os.getenv('PROFILE_PAGE_SIZE_MAX', 100))
+MATCHES_DEFAULT = 10
+MATCHES_MAX = 50
+AVAILABILITY_FILTERS = ('covers', 'overlaps')
+AUTOCOMPLETE_DEFAULT = 10
+AUTOCOMPLETE_MAX = 25
+CHAT_PAGE_SIZE_DEFAULT = 50
+CHAT_PAGE_SIZE_MAX = 200
 
 # Initialize auth service
 auth_service = AuthService(DB_CONFIG)
 
-# Database connection function
+# Database connection function - checks out from the shared pool, close() returns it
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    return get_pool(DB_CONFIG).get_connection()
+
+def not_modified_response(etag):
+    """Return a bare 304 if the client's If-None-Match already matches etag, else None"""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+def with_etag(response, etag):
+    """Attach a strong ETag and require revalidation on every use"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/register', methods=['POST'])
 @handle_errors(include_details=True)
@@ -57,6 +96,8 @@ def register():
     success, message, user_id = auth_service.register_user(user_data, ip_address)
     
     if success:
+        profile_cache.evict([user_id])
+        table_versions.bump('profiles')
         log_user_action(user_id, "registration_completed", {
             "email": user_data['email'],
             "ip_address": ip_address
@@ -99,6 +140,12 @@ def login():
 
 @app.route('/skills', methods=['GET'])
 def get_skills():
+    # Version is read before the query so a concurrent add_skill can only make the tag older
+    etag = table_versions.etag('skills')
+    cached = not_modified_response(etag)
+    if cached:
+        return cached
+    
     try:
         db = get_db_connection()
         cursor = db.cursor()
@@ -112,7 +159,7 @@ def get_skills():
             })
         cursor.close()
         db.close()
-        return jsonify({'skills': skills}), 200
+        return with_etag(jsonify({'skills': skills}), etag), 200
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
 
@@ -136,13 +183,36 @@ def add_skill():
         cursor = db.cursor()
         cursor.execute("INSERT INTO skills (name, category) VALUES (%s, %s)", (name, category))
         db.commit()
+        table_versions.bump('skills')
         skill_id = cursor.lastrowid
+        skill_autocomplete.add_skill(skill_id, name, category)
         cursor.close()
         db.close()
         return jsonify({'message': 'Skill added successfully', 'skill_id': skill_id}), 201
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
 
+@app.route('/skills/autocomplete', methods=['GET'])
+def autocomplete_skills():
+    """Top skills whose name (or any word of it) starts with ?q=, most offered/wanted first"""
+    prefix = request.args.get('q', '').strip()
+    try:
+        limit = int(request.args.get('limit', AUTOCOMPLETE_DEFAULT))
+    except ValueError:
+        return jsonify({'message': 'Limit must be an integer'}), 400
+    limit = max(1, min(limit, AUTOCOMPLETE_MAX))
+    
+    try:
+        db = get_db_connection()
+        cursor = db.cursor()
+        # Picks up catalog and user-skill rows written by any worker since the last sync (no-op if none)
+        skill_autocomplete.sync(cursor)
+        cursor.close()
+        db.close()
+        return jsonify({'skills': skill_autocomplete.complete(prefix, limit)}), 200
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Database error: {err}'}), 500
+
 @app.route('/user-skills-offered', methods=['POST'])
 def add_offered_skill():
     data = request.get_json()
@@ -175,7 +245,11 @@ def add_offered_skill():
         # Insert offered skill
         cursor.execute("INSERT INTO user_skills_offered (user_id, skill_id, proficiency_level) VALUES (%s, %s, %s)", 
                       (user_id, skill_id, proficiency_level))
+        rebuild_profile_snapshot(cursor, user_id)
         db.commit()
+        profile_cache.evict([user_id])
+        table_versions.bump('profiles')
+        skill_match_index.add_offered(user_id, skill_id, proficiency_level)
         cursor.close()
         db.close()
         return jsonify({'message': 'Offered skill added successfully'}), 201
@@ -218,7 +292,11 @@ def add_wanted_skill():
         # Insert wanted skill
         cursor.execute("INSERT INTO user_skills_wanted (user_id, skill_id, desired_level) VALUES (%s, %s, %s)", 
                       (user_id, skill_id, desired_level))
+        rebuild_profile_snapshot(cursor, user_id)
         db.commit()
+        profile_cache.evict([user_id])
+        table_versions.bump('profiles')
+        skill_match_index.add_wanted(user_id, skill_id, desired_level)
         cursor.close()
         db.close()
         return jsonify({'message': 'Wanted skill added successfully'}), 201
@@ -259,7 +337,14 @@ def add_availability():
         cursor = db.cursor()
         cursor.execute("INSERT INTO availability (user_id, day, time_slot) VALUES (%s, %s, %s)", 
                       (user_id, day, time_slot))
+        # Keep the packed mask in the same transaction as the row it summarizes
+        cursor.execute("UPDATE users SET availability_mask = availability_mask | %s WHERE id = %s",
+                      (slot_bit(day, time_slot), user_id))
+        rebuild_profile_snapshot(cursor, user_id)
         db.commit()
+        profile_cache.evict([user_id])
+        table_versions.bump('profiles')
+        availability_index.add_slot(user_id, day, time_slot)
         cursor.close()
         db.close()
         print(f"DEBUG: Successfully inserted availability for user {user_id}")  # Debug success
@@ -348,78 +433,142 @@ def session_test():
         'has_session': bool(session)
     }), 200
 
+def encode_profile_cursor(created_at, user_id):
+    """Encode the (created_at, id) keyset position as an opaque cursor"""
+    payload = json.dumps([created_at.isoformat() if created_at else None, user_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_profile_cursor(token):
+    """Decode an opaque cursor back to (created_at, id); raises ValueError if malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(user_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+def parse_profile_page_args():
+    """Read ?cursor= and ?limit= for a profile listing, clamping limit to the server maximum"""
+    try:
+        limit = int(request.args.get('limit', PROFILE_PAGE_SIZE_DEFAULT))
+    except ValueError:
+        raise ValueError('Limit must be an integer')
+    limit = max(1, min(limit, PROFILE_PAGE_SIZE_MAX))
+    
+    token = request.args.get('cursor')
+    position = decode_profile_cursor(token) if token else None
+    return position, limit
+
+def fetch_profile_page(cursor, position, limit, exclude_user_id=None):
+    """Fetch one keyset page of public profile snapshots ordered by (created_at, id) DESC.
+    
+    Seeks past the previous page's last row instead of using OFFSET, so every
+    page costs the same index range scan. Returns ([(user_id, fragment)], next_cursor)
+    where each fragment is the profile's pre-encoded JSON.
+    """
+    query = """
+        SELECT ps.user_id, ps.created_at, ps.version
+        FROM profile_snapshots ps
+        WHERE ps.is_public = TRUE AND ps.has_skills = TRUE
+    """
+    params = []
+    
+    if exclude_user_id:
+        query += " AND ps.user_id != %s"
+        params.append(exclude_user_id)
+    
+    if position:
+        created_at, last_id = position
+        query += " AND (ps.created_at < %s OR (ps.created_at = %s AND ps.user_id < %s))"
+        params.extend([created_at, created_at, last_id])
+    
+    # Fetch one extra row to know whether another page exists
+    query += " ORDER BY ps.created_at DESC, ps.user_id DESC LIMIT %s"
+    params.append(limit + 1)
+    
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_id, last_created_at, _ = rows[-1]
+        next_cursor = encode_profile_cursor(last_created_at, last_id)
+    
+    return load_profile_fragments(cursor, [(user_id, version) for user_id, _, version in rows]), next_cursor
+
+def load_profile_fragments(cursor, keys):
+    """Return [(user_id, fragment)] for (user_id, version) keys, encoding only cache misses"""
+    fragments = {}
+    missing = []
+    for user_id, version in keys:
+        fragment = profile_cache.get(user_id, version)
+        if fragment is None:
+            missing.append(user_id)
+        else:
+            fragments[user_id] = fragment
+    
+    if missing:
+        placeholders = ', '.join(['%s'] * len(missing))
+        cursor.execute(f"""
+            SELECT user_id, version, document
+            FROM profile_snapshots
+            WHERE user_id IN ({placeholders})
+        """, missing)
+        for user_id, version, document in cursor.fetchall():
+            fragment = profile_cache.encode(to_listing_profile(json.loads(document)))
+            profile_cache.put(user_id, version, fragment)
+            fragments[user_id] = fragment
+    
+    return [(user_id, fragments[user_id]) for user_id, _ in keys if user_id in fragments]
+
+def load_snapshot_versions(cursor, user_ids):
+    """Current snapshot version for each user id (None where no snapshot exists), in order"""
+    if not user_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    cursor.execute(f"""
+        SELECT user_id, version FROM profile_snapshots WHERE user_id IN ({placeholders})
+    """, list(user_ids))
+    versions = dict(cursor.fetchall())
+    return [versions.get(user_id) for user_id in user_ids]
+
+def profile_page_response(fragments, next_cursor):
+    """Build the listing body by concatenating cached fragments instead of re-serializing"""
+    body = b''.join([
+        b'{"profiles":[',
+        b','.join(fragments),
+        b'],"next_cursor":',
+        json.dumps(next_cursor).encode('utf-8'),
+        b'}'
+    ])
+    return Response(body, status=200, mimetype='application/json')
+
 @app.route('/profiles', methods=['GET'])
 def get_all_profiles():
-    """Get all user profiles with their skills and availability for dashboard (excludes current user)"""
+    """Get a page of user profiles with their skills and availability for dashboard (excludes current user)"""
     current_user_id = session.get('user_id')
     
+    try:
+        position, limit = parse_profile_page_args()
+    except ValueError as err:
+        return jsonify({'message': str(err)}), 400
+    
+    etag = table_versions.etag('profiles', 'profiles', current_user_id, request.args.get('cursor'), limit)
+    cached = not_modified_response(etag)
+    if cached:
+        return cached
+    
     try:
         db = get_db_connection()
         cursor = db.cursor()
         
-        # Get all public users with their details, excluding current user
-        if current_user_id:
-            cursor.execute("""
-                SELECT u.id, u.name, u.email, u.location, u.is_public, u.created_at
-                FROM users u 
-                WHERE u.is_public = TRUE AND u.id != %s
-                ORDER BY u.created_at DESC
-            """, (current_user_id,))
-        else:
-            # If no user is logged in, show all public profiles
-            cursor.execute("""
-                SELECT u.id, u.name, u.email, u.location, u.is_public, u.created_at
-                FROM users u 
-                WHERE u.is_public = TRUE
-                ORDER BY u.created_at DESC
-            """)
-        
-        users = []
-        for user_row in cursor.fetchall():
-            user_id, name, email, location, is_public, created_at = user_row
-            
-            # Get offered skills for this user
-            cursor.execute("""
-                SELECT s.name, uso.proficiency_level
-                FROM user_skills_offered uso
-                JOIN skills s ON uso.skill_id = s.id
-                WHERE uso.user_id = %s
-            """, (user_id,))
-            offered_skills = [{'name': skill[0], 'proficiency': skill[1]} for skill in cursor.fetchall()]
-            
-            # Get wanted skills for this user
-            cursor.execute("""
-                SELECT s.name, usw.desired_level
-                FROM user_skills_wanted usw
-                JOIN skills s ON usw.skill_id = s.id
-                WHERE usw.user_id = %s
-            """, (user_id,))
-            wanted_skills = [{'name': skill[0], 'desired_level': skill[1]} for skill in cursor.fetchall()]
-            
-            # Get availability for this user
-            cursor.execute("""
-                SELECT day, time_slot
-                FROM availability
-                WHERE user_id = %s
-            """, (user_id,))
-            availability = [{'day': av[0], 'time_slot': av[1]} for av in cursor.fetchall()]
-            
-            # Only include users who have completed their profile (have at least one skill)
-            if offered_skills or wanted_skills:
-                users.append({
-                    'id': user_id,
-                    'name': name,
-                    'email': email,
-                    'location': location,
-                    'offered_skills': offered_skills,
-                    'wanted_skills': wanted_skills,
-                    'availability': availability,
-                    'created_at': created_at.isoformat() if created_at else None
-                })
+        # Get completed public profiles, excluding current user if logged in
+        profiles, next_cursor = fetch_profile_page(cursor, position, limit, current_user_id)
         
         cursor.close()
         db.close()
-        return jsonify({'profiles': users}), 200
+        return with_etag(profile_page_response([fragment for _, fragment in profiles], next_cursor), etag)
         
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
@@ -436,130 +585,176 @@ def get_current_user_profile():
         db = get_db_connection()
         cursor = db.cursor()
         
-        # Get user details
-        cursor.execute("""
-            SELECT id, name, email, location, is_public, created_at
-            FROM users 
-            WHERE id = %s
-        """, (user_id,))
+        # Serve the materialized snapshot; build it on first access if it is missing
+        profile = load_profile_snapshot(cursor, user_id)
+        if profile is None:
+            profile = rebuild_profile_snapshot(cursor, user_id)
+            db.commit()
         
-        user_row = cursor.fetchone()
-        if not user_row:
-            cursor.close()
-            db.close()
-            return jsonify({'message': 'User not found'}), 404
+        cursor.close()
+        db.close()
         
-        user_id, name, email, location, is_public, created_at = user_row
+        if profile is None:
+            return jsonify({'message': 'User not found'}), 404
         
-        # Get offered skills
-        cursor.execute("""
-            SELECT s.id, s.name, uso.proficiency_level
-            FROM user_skills_offered uso
-            JOIN skills s ON uso.skill_id = s.id
-            WHERE uso.user_id = %s
-        """, (user_id,))
-        offered_skills = [{'id': skill[0], 'name': skill[1], 'proficiency': skill[2]} for skill in cursor.fetchall()]
+        return jsonify({'profile': profile}), 200
         
-        # Get wanted skills
-        cursor.execute("""
-            SELECT s.id, s.name, usw.desired_level
-            FROM user_skills_wanted usw
-            JOIN skills s ON usw.skill_id = s.id
-            WHERE usw.user_id = %s
-        """, (user_id,))
-        wanted_skills = [{'id': skill[0], 'name': skill[1], 'desired_level': skill[2]} for skill in cursor.fetchall()]
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Database error: {err}'}), 500
+
+@app.route('/all-profiles', methods=['GET'])
+def get_all_profiles_including_current():
+    """Get a page of ALL user profiles with their skills and availability (includes current user)"""
+    try:
+        position, limit = parse_profile_page_args()
+    except ValueError as err:
+        return jsonify({'message': str(err)}), 400
+    
+    current_user_id = session.get('user_id')
+    etag = table_versions.etag('profiles', 'all-profiles', current_user_id, request.args.get('cursor'), limit)
+    cached = not_modified_response(etag)
+    if cached:
+        return cached
+    
+    try:
+        db = get_db_connection()
+        cursor = db.cursor()
         
-        # Get availability
-        cursor.execute("""
-            SELECT day, time_slot
-            FROM availability
-            WHERE user_id = %s
-        """, (user_id,))
-        availability = [{'day': av[0], 'time_slot': av[1]} for av in cursor.fetchall()]
-        
-        profile = {
-            'id': user_id,
-            'name': name,
-            'email': email,
-            'location': location,
-            'is_public': is_public,
-            'offered_skills': offered_skills,
-            'wanted_skills': wanted_skills,
-            'availability': availability,
-            'created_at': created_at.isoformat() if created_at else None
-        }
+        # Get completed public profiles (including current user)
+        profiles, next_cursor = fetch_profile_page(cursor, position, limit)
         
         cursor.close()
         db.close()
-        return jsonify({'profile': profile}), 200
+        
+        # Splice the per-viewer flag into each cached fragment (which always ends in '}')
+        fragments = [
+            fragment[:-1] + (b',"is_current_user":true}' if user_id == current_user_id
+                             else b',"is_current_user":false}')
+            for user_id, fragment in profiles
+        ]
+        return with_etag(profile_page_response(fragments, next_cursor), etag)
         
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
 
-@app.route('/all-profiles', methods=['GET'])
-def get_all_profiles_including_current():
-    """Get ALL user profiles with their skills and availability (includes current user)"""
+@app.route('/matches', methods=['GET'])
+def get_matches():
+    """Get the top reciprocal matches: users who offer what I want and want what I offer"""
+    current_user_id = session.get('user_id')
+    
+    if not current_user_id:
+        return jsonify({'message': 'User not authenticated'}), 401
+    
+    try:
+        limit = int(request.args.get('limit', MATCHES_DEFAULT))
+    except ValueError:
+        return jsonify({'message': 'Limit must be an integer'}), 400
+    limit = max(1, min(limit, MATCHES_MAX))
+    
+    available = request.args.get('available')
+    if available is not None and available not in AVAILABILITY_FILTERS:
+        return jsonify({'message': f'available must be one of: {", ".join(AVAILABILITY_FILTERS)}'}), 400
+    
     try:
         db = get_db_connection()
         cursor = db.cursor()
         
-        # Get all public users with their details (including current user)
-        cursor.execute("""
-            SELECT u.id, u.name, u.email, u.location, u.is_public, u.created_at
-            FROM users u 
-            WHERE u.is_public = TRUE
-            ORDER BY u.created_at DESC
-        """)
+        # Picks up skill and availability rows written by any worker since the last sync (no-op if none)
+        skill_match_index.sync(cursor)
+        availability_index.sync(cursor)
         
-        users = []
-        current_user_id = session.get('user_id')
+        my_mask = availability_index.mask_for(current_user_id)
+        among = None
+        if available == 'covers':
+            among = availability_index.free_whenever(my_mask)
+        elif available == 'overlaps':
+            among = availability_index.overlapping(my_mask)
         
-        for user_row in cursor.fetchall():
-            user_id, name, email, location, is_public, created_at = user_row
-            
-            # Get offered skills for this user
-            cursor.execute("""
-                SELECT s.name, uso.proficiency_level
-                FROM user_skills_offered uso
-                JOIN skills s ON uso.skill_id = s.id
-                WHERE uso.user_id = %s
-            """, (user_id,))
-            offered_skills = [{'name': skill[0], 'proficiency': skill[1]} for skill in cursor.fetchall()]
-            
-            # Get wanted skills for this user
-            cursor.execute("""
-                SELECT s.name, usw.desired_level
-                FROM user_skills_wanted usw
-                JOIN skills s ON usw.skill_id = s.id
-                WHERE usw.user_id = %s
-            """, (user_id,))
-            wanted_skills = [{'name': skill[0], 'desired_level': skill[1]} for skill in cursor.fetchall()]
-            
-            # Get availability for this user
-            cursor.execute("""
-                SELECT day, time_slot
-                FROM availability
-                WHERE user_id = %s
-            """, (user_id,))
-            availability = [{'day': av[0], 'time_slot': av[1]} for av in cursor.fetchall()]
-            
-            # Include all users who have completed their profile (have at least one skill)
-            if offered_skills or wanted_skills:
-                users.append({
-                    'id': user_id,
-                    'name': name,
-                    'email': email,
-                    'location': location,
-                    'offered_skills': offered_skills,
-                    'wanted_skills': wanted_skills,
-                    'availability': availability,
-                    'created_at': created_at.isoformat() if created_at else None,
-                    'is_current_user': user_id == current_user_id  # Flag to identify current user
-                })
+        matches = skill_match_index.top_matches(
+            current_user_id, limit, my_mask=my_mask,
+            mask_for=availability_index.mask_for, among=among
+        )
+        
+        # Attach each match's cached public profile fragment
+        match_ids = [match['user_id'] for match in matches]
+        versions = load_snapshot_versions(cursor, match_ids)
+        fragments = dict(load_profile_fragments(cursor, list(zip(match_ids, versions))))
         
         cursor.close()
         db.close()
-        return jsonify({'profiles': users}), 200
+        
+        entries = []
+        for match in matches:
+            fragment = fragments.get(match['user_id'])
+            if fragment is None:
+                continue
+            entry = json.dumps(match, separators=(',', ':')).encode('utf-8')
+            entries.append(entry[:-1] + b',"profile":' + fragment + b'}')
+        
+        return Response(b'{"matches":[' + b','.join(entries) + b']}', status=200, mimetype='application/json')
+        
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Database error: {err}'}), 500
+
+@app.route('/availability/compatible', methods=['GET'])
+def get_compatible_availability():
+    """Get public profiles whose availability covers (or overlaps) the current user's, most shared slots first"""
+    current_user_id = session.get('user_id')
+    
+    if not current_user_id:
+        return jsonify({'message': 'User not authenticated'}), 401
+    
+    mode = request.args.get('mode', 'covers')
+    if mode not in AVAILABILITY_FILTERS:
+        return jsonify({'message': f'mode must be one of: {", ".join(AVAILABILITY_FILTERS)}'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', MATCHES_DEFAULT))
+    except ValueError:
+        return jsonify({'message': 'Limit must be an integer'}), 400
+    limit = max(1, min(limit, MATCHES_MAX))
+    
+    try:
+        db = get_db_connection()
+        cursor = db.cursor()
+        
+        availability_index.sync(cursor)
+        my_mask = availability_index.mask_for(current_user_id)
+        if mode == 'covers':
+            candidates = availability_index.free_whenever(my_mask)
+        else:
+            candidates = availability_index.overlapping(my_mask)
+        candidates.discard(current_user_id)
+        ranked = sorted(
+            candidates,
+            key=lambda uid: (-shared_slot_count(my_mask, availability_index.mask_for(uid)), uid)
+        )
+        
+        # Walk the ranking in chunks, keeping public profiles until the page is full
+        keys = []
+        chunk = limit * 2
+        for start in range(0, len(ranked), chunk):
+            batch = ranked[start:start + chunk]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f"""
+                SELECT user_id, version FROM profile_snapshots
+                WHERE is_public = TRUE AND user_id IN ({placeholders})
+            """, batch)
+            versions = dict(cursor.fetchall())
+            keys.extend((uid, versions[uid]) for uid in batch if uid in versions)
+            if len(keys) >= limit:
+                break
+        fragments = load_profile_fragments(cursor, keys[:limit])
+        
+        cursor.close()
+        db.close()
+        
+        entries = [
+            b'{"shared_slots":' + str(shared_slot_count(my_mask, availability_index.mask_for(uid))).encode('ascii')
+            + b',"profile":' + fragment + b'}'
+            for uid, fragment in fragments
+        ]
+        return Response(b'{"users":[' + b','.join(entries) + b']}', status=200, mimetype='application/json')
         
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
@@ -622,8 +817,13 @@ def send_skill_swap_request():
             INSERT INTO notifications (user_id, type, title, message, related_request_id) 
             VALUES (%s, 'skill_swap_request', %s, %s, %s)
         """, (requestee_id, notification_title, notification_message, request_id))
+        notification_id = cursor.lastrowid
+        record_unread(cursor, requestee_id)
         
         db.commit()
+        notification_hub.publish_notification(requestee_id, notification_id)
+        publish_notification(requestee_id, notification_id)
+        publish_request_status(request_id)
         cursor.close()
         db.close()
         
@@ -767,8 +967,14 @@ def respond_to_skill_swap_request(request_id):
             INSERT INTO notifications (user_id, type, title, message, related_request_id) 
             VALUES (%s, %s, %s, %s, %s)
         """, (requester_id, f'request_{response}', notification_title, notification_message, request_id))
+        notification_id = cursor.lastrowid
+        record_unread(cursor, requester_id)
         
         db.commit()
+        swap_request_cache.evict(request_id)
+        notification_hub.publish_notification(requester_id, notification_id)
+        publish_notification(requester_id, notification_id)
+        publish_request_status(request_id)
         cursor.close()
         db.close()
         
@@ -822,9 +1028,13 @@ def get_notifications():
                 'created_at': notif[6].isoformat() if notif[6] else None
             })
         
-        # Get unread count
-        cursor.execute("SELECT COUNT(*) FROM notifications WHERE user_id = %s AND is_read = FALSE", (current_user_id,))
-        unread_count = cursor.fetchone()[0]
+        # Announcements are stored once; the unseen ones are merged in here
+        notifications.extend(unseen_announcements(cursor, current_user_id, limit))
+        notifications.sort(key=lambda notif: notif['created_at'] or '', reverse=True)
+        notifications = notifications[:limit]
+        
+        # Maintained counter instead of COUNT(*) over the user's notifications
+        unread_count = get_unread_count(cursor, current_user_id)
         
         cursor.close()
         db.close()
@@ -852,15 +1062,23 @@ def mark_notification_read(notification_id):
         cursor.execute("""
             UPDATE notifications 
             SET is_read = TRUE 
-            WHERE id = %s AND user_id = %s
+            WHERE id = %s AND user_id = %s AND is_read = FALSE
         """, (notification_id, current_user_id))
         
         if cursor.rowcount == 0:
+            # Already read is still a success (retries, double clicks); only a missing row is a 404
+            cursor.execute("SELECT 1 FROM notifications WHERE id = %s AND user_id = %s",
+                           (notification_id, current_user_id))
+            exists = cursor.fetchone() is not None
             cursor.close()
             db.close()
-            return jsonify({'message': 'Notification not found'}), 404
+            if not exists:
+                return jsonify({'message': 'Notification not found'}), 404
+            return jsonify({'message': 'Notification marked as read'}), 200
         
+        record_read(cursor, current_user_id)
         db.commit()
+        notification_hub.publish_read(current_user_id)
         cursor.close()
         db.close()
         
@@ -888,8 +1106,11 @@ def mark_all_notifications_read():
         """, (current_user_id,))
         
         updated_count = cursor.rowcount
+        clear_unread(cursor, current_user_id)
+        mark_announcements_seen(cursor, current_user_id)
         
         db.commit()
+        notification_hub.publish_read(current_user_id)
         cursor.close()
         db.close()
         
@@ -900,6 +1121,53 @@ def mark_all_notifications_read():
     except mysql.connector.Error as err:
         return jsonify({'message': f'Database error: {err}'}), 500
 
+@app.route('/notifications/announcement-<int:announcement_id>/read', methods=['POST'])
+@app.route('/notifications/announcement-<int:announcement_id>/mark-read', methods=['POST'])
+def mark_announcement_read(announcement_id):
+    """Mark an announcement (and every older one) as seen by advancing the user's watermark"""
+    current_user_id = session.get('user_id')
+    
+    if not current_user_id:
+        return jsonify({'message': 'User not authenticated'}), 401
+    
+    try:
+        db = get_db_connection()
+        cursor = db.cursor()
+        mark_announcements_seen(cursor, current_user_id, announcement_id)
+        db.commit()
+        notification_hub.publish_read(current_user_id)
+        cursor.close()
+        db.close()
+        
+        return jsonify({'success': True, 'message': 'Notification marked as read'}), 200
+        
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Database error: {err}'}), 500
+
+@app.route('/notifications/stream', methods=['GET'])
+def stream_notifications():
+    """Server-Sent Events stream of new notifications and unread-count changes"""
+    current_user_id = session.get('user_id')
+    
+    if not current_user_id:
+        return jsonify({'message': 'User not authenticated'}), 401
+    
+    # EventSource resends the id of the last event it received when reconnecting
+    try:
+        last_event_id = parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    except ValueError:
+        return jsonify({'message': 'Malformed Last-Event-ID'}), 400
+    
+    try:
+        connection = notification_hub.connect(current_user_id, last_event_id)
+    except mysql.connector.Error as err:
+        return jsonify({'message': f'Database error: {err}'}), 500
+    
+    return Response(notification_hub.stream(connection), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # Email verification and password reset endpoints
 @app.route('/verify-email', methods=['POST'])
 @handle_errors(include_details=True)
@@ -993,34 +1261,87 @@ def get_chat_messages(request_id):
     
     user_id = session['user_id']
     
+    cursors = {}
+    for name in ('after_id', 'before_id'):
+        value = request.args.get(name)
+        if value is not None:
+            try:
+                cursors[name] = int(value)
+            except ValueError:
+                raise ValidationException(f"{name} must be an integer", field=name)
+    if len(cursors) > 1:
+        raise ValidationException("Use either after_id or before_id, not both")
+    after_id = cursors.get('after_id')
+    before_id = cursors.get('before_id')
+    
+    try:
+        limit = int(request.args.get('limit', CHAT_PAGE_SIZE_DEFAULT))
+    except ValueError:
+        raise ValidationException("limit must be an integer", field='limit')
+    limit = max(1, min(limit, CHAT_PAGE_SIZE_MAX))
+    
     with get_db_connection() as conn:
-        cursor = conn.cursor(dictionary=True)
+        # Check if user is part of this request (cached; queries only on a miss)
+        if not swap_request_cache.is_chat_member(conn, request_id, user_id):
+            return jsonify({'error': 'Unauthorized access to chat'}), 403
         
-        # Check if user is part of this request
-        cursor.execute("""
-            SELECT requester_id, requestee_id 
-            FROM skill_swap_requests 
-            WHERE id = %s AND status = 'accepted'
-        """, (request_id,))
+        cursor = conn.cursor(dictionary=True)
         
-        request_data = cursor.fetchone()
-        if not request_data or user_id not in [request_data['requester_id'], request_data['requestee_id']]:
-            return jsonify({'error': 'Unauthorized access to chat'}), 403
+        if after_id is not None:
+            # Up to `limit` messages newer than after_id: a range on idx_request_sent (request_id, sent_at),
+            # starting at that message's timestamp, with the id tiebreak filtered in the index.
+            # One extra row tells the client whether to keep catching up from the last id.
+            cursor.execute("""
+                SELECT cm.id, cm.message, cm.sent_at, cm.sender_id,
+                       cm.sender_id = %s as is_from_current_user
+                FROM chat_messages cm
+                WHERE cm.request_id = %s
+                  AND cm.sent_at >= COALESCE((SELECT sent_at FROM chat_messages WHERE id = %s), '1970-01-01')
+                  AND cm.id > %s
+                ORDER BY cm.sent_at ASC, cm.id ASC
+                LIMIT %s
+            """, (user_id, request_id, after_id, after_id, limit + 1))
+            messages = cursor.fetchall()
+            
+            if not messages:
+                # Nothing new: no body to build, send or parse
+                return Response(status=204)
+            
+            return jsonify({
+                'success': True,
+                'messages': messages[:limit],
+                # True if more messages follow: fetch again with the last id returned
+                'has_more': len(messages) > limit
+            })
         
-        # Get messages
-        cursor.execute("""
+        # Newest page (or the page older than before_id): walk idx_request_sent backwards,
+        # reading one extra row to learn whether anything older is left
+        older_than = ""
+        params = [user_id, request_id]
+        if before_id is not None:
+            older_than = """
+                  AND cm.sent_at <= COALESCE((SELECT sent_at FROM chat_messages WHERE id = %s), '1970-01-01')
+                  AND cm.id < %s"""
+            params += [before_id, before_id]
+        cursor.execute(f"""
             SELECT cm.id, cm.message, cm.sent_at, cm.sender_id,
                    cm.sender_id = %s as is_from_current_user
             FROM chat_messages cm
-            WHERE cm.request_id = %s
-            ORDER BY cm.sent_at ASC
-        """, (user_id, request_id))
-        
+            WHERE cm.request_id = %s{older_than}
+            ORDER BY cm.sent_at DESC, cm.id DESC
+            LIMIT %s
+        """, params + [limit + 1])
         messages = cursor.fetchall()
         
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        messages.reverse()
+        
         return jsonify({
             'success': True,
-            'messages': messages
+            'messages': messages,
+            # Pass back as ?before_id= to load the previous page; null once the start is reached
+            'before_id': messages[0]['id'] if has_more else None
         })
 
 @app.route('/chat/send', methods=['POST'])
@@ -1035,7 +1356,10 @@ def send_chat_message():
     )
     
     user_id = session['user_id']
-    request_id = data['request_id']
+    try:
+        request_id = int(data['request_id'])
+    except (TypeError, ValueError):
+        raise ValidationException("request_id must be an integer", field='request_id')
     message = data['message'].strip()
     
     if not message:
@@ -1045,26 +1369,22 @@ def send_chat_message():
         raise ValidationException("Message too long (max 500 characters)")
     
     with get_db_connection() as conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if user is part of this request
-        cursor.execute("""
-            SELECT requester_id, requestee_id 
-            FROM skill_swap_requests 
-            WHERE id = %s AND status = 'accepted'
-        """, (request_id,))
-        
-        request_data = cursor.fetchone()
-        if not request_data or user_id not in [request_data['requester_id'], request_data['requestee_id']]:
+        # Check if user is part of this request (cached; queries only on a miss)
+        if not swap_request_cache.is_chat_member(conn, request_id, user_id):
             return jsonify({'error': 'Unauthorized access to chat'}), 403
         
+        cursor = conn.cursor(dictionary=True)
+        
         # Insert message
         cursor.execute("""
             INSERT INTO chat_messages (request_id, sender_id, message, sent_at)
             VALUES (%s, %s, %s, NOW())
         """, (request_id, user_id, message))
+        message_id = cursor.lastrowid
         
         conn.commit()
+        # Pushed by the WebSocket hub to the sockets in this conversation's room
+        publish_chat_message(request_id, message_id)
         
         return jsonify({
             'success': True,
@@ -1125,10 +1445,17 @@ def admin_reject_skill(skill_id):
     
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        # The delete cascades to user_skills_offered / user_skills_wanted: rebuild those users' snapshots with it
+        affected_users = skill_user_ids(cursor, skill_id)
         cursor.execute("DELETE FROM skills WHERE id = %s", (skill_id,))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            rebuild_profile_snapshots(cursor, affected_users)
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if deleted:
+            profile_cache.evict(affected_users)
+            table_versions.bump('skills', 'profiles')
             return jsonify({'success': True, 'message': 'Skill rejected successfully'})
         else:
             return jsonify({'success': False, 'message': 'Skill not found'}), 404
@@ -1166,9 +1493,14 @@ def admin_ban_user(user_id):
     with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET name = CONCAT(name, ' (BANNED)') WHERE id = %s", (user_id,))
+        banned = cursor.rowcount > 0
+        if banned:
+            rebuild_profile_snapshot(cursor, user_id)
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if banned:
+            profile_cache.evict([user_id])
+            table_versions.bump('profiles', 'users')
             return jsonify({'success': True, 'message': 'User banned successfully'})
         else:
             return jsonify({'success': False, 'message': 'User not found'}), 404
@@ -1247,31 +1579,97 @@ def admin_send_broadcast_message():
     message = data.get('message')
     title = data.get('title', 'Admin Broadcast')
     
+    # One announcements row regardless of user count; users see it through their watermark
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Get all active users (not banned)
-        cursor.execute("SELECT id FROM users WHERE name NOT LIKE '%BANNED%'")
-        users = cursor.fetchall()
-        
-        if not users:
-            return jsonify({'success': False, 'message': 'No active users found'}), 404
-        
-        # Send notification to each user
-        for user in users:
-            user_id = user[0]
-            cursor.execute("""
-                INSERT INTO notifications (user_id, type, title, message, is_read, created_at)
-                VALUES (%s, 'message', %s, %s, FALSE, NOW())
-            """, (user_id, title, message))
-        
+        announcement_id = create_announcement(cursor, title, message)
         conn.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': f'Broadcast message sent successfully to {len(users)} users',
-            'users_notified': len(users)
-        })
+    notification_hub.publish_announcement(announcement_id)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Broadcast message published',
+        'announcement_id': announcement_id,
+        'status_url': f'/admin/announcements/{announcement_id}'
+    }), 201
+
+@app.route('/admin/announcements/<int:announcement_id>', methods=['GET'])
+@app.route('/admin/broadcasts/<int:announcement_id>', methods=['GET'])
+@handle_errors()
+def admin_get_announcement_status(announcement_id):
+    """Get how many users an announcement has reached so far"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        announcement = get_announcement_status(cursor, announcement_id)
+        cursor.close()
+    
+    if not announcement:
+        return jsonify({'success': False, 'message': 'Announcement not found'}), 404
+    
+    return jsonify({'success': True, 'announcement': announcement})
+
+@app.route('/admin/db-pool-stats', methods=['GET'])
+@handle_errors()
+def admin_db_pool_stats():
+    """Get database connection pool occupancy and wait-time stats"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'pool': get_pool(DB_CONFIG).stats()
+    })
+
+@app.route('/admin/notification-hub-stats', methods=['GET'])
+@handle_errors()
+def admin_notification_hub_stats():
+    """Get SSE connection counts and delivery stats for this worker"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'hub': notification_hub.stats()
+    })
+
+@app.route('/admin/profile-cache-stats', methods=['GET'])
+@handle_errors()
+def admin_profile_cache_stats():
+    """Get profile fragment cache size and hit/miss counters"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'cache': profile_cache.stats()
+    })
+
+@app.route('/admin/request-cache-stats', methods=['GET'])
+@handle_errors()
+def admin_request_cache_stats():
+    """Get chat authorization cache size and hit/miss counters for this worker"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'cache': swap_request_cache.stats()
+    })
+
+@app.route('/admin/password-hasher-stats', methods=['GET'])
+@handle_errors()
+def admin_password_hasher_stats():
+    """Get bcrypt pool occupancy, rejections and latency for this worker"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'Admin authentication required'}), 401
+    
+    return jsonify({
+        'success': True,
+        'hasher': password_hasher.stats()
+    })
 
 @app.route('/admin/download_reports', methods=['GET'])
 @handle_errors()
@@ -1338,9 +1736,16 @@ def get_user_notifications():
             if notification['created_at']:
                 notification['created_at'] = notification['created_at'].isoformat()
         
+        counts_cursor = conn.cursor()
+        notifications.extend(unseen_announcements(counts_cursor, user_id, 50))
+        notifications.sort(key=lambda notif: notif['created_at'] or '', reverse=True)
+        unread_count = get_unread_count(counts_cursor, user_id)
+        counts_cursor.close()
+        
         return jsonify({
             'success': True,
-            'notifications': notifications
+            'notifications': notifications[:50],
+            'unread_count': unread_count
         })
 
 @app.route('/notifications/<int:notification_id>/read', methods=['POST'])
@@ -1357,11 +1762,22 @@ def mark_user_notification_read(notification_id):
         cursor.execute("""
             UPDATE notifications 
             SET is_read = TRUE 
-            WHERE id = %s AND user_id = %s
+            WHERE id = %s AND user_id = %s AND is_read = FALSE
         """, (notification_id, user_id))
+        updated = cursor.rowcount
+        if updated:
+            record_read(cursor, user_id)
+            exists = True
+        else:
+            # Already read is still a success (retries, double clicks); only a missing row is a 404
+            cursor.execute("SELECT 1 FROM notifications WHERE id = %s AND user_id = %s",
+                           (notification_id, user_id))
+            exists = cursor.fetchone() is not None
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if updated > 0:
+            notification_hub.publish_read(user_id)
+        if exists:
             return jsonify({
                 'success': True,
                 'message': 'Notification marked as read'
@@ -0,0 +1,120 @@
+# Availability
+# Packed weekly availability bitmasks and an in-memory overlap index
+
+import threading
+from typing import Dict, List, Set
+
+from table_versions import table_versions
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TIME_SLOTS = ['Morning', 'Afternoon', 'Evening', 'Night']
+
+# Bit (day_index * len(TIME_SLOTS) + slot_index) is set when the user is free then;
+# 7 days x 4 slots = 28 bits, so a mask fits an INT UNSIGNED column
+_DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+_SLOT_INDEX = {slot: i for i, slot in enumerate(TIME_SLOTS)}
+
+# Incremental refreshes re-read this many availability ids below the watermark
+REFRESH_OVERLAP_ROWS = 200
+
+def slot_bit(day: str, time_slot: str) -> int:
+    """Bit for one (day, time_slot) pair; raises KeyError for unknown values"""
+    return 1 << (_DAY_INDEX[day] * len(TIME_SLOTS) + _SLOT_INDEX[time_slot])
+
+def mask_to_slots(mask: int) -> List[Dict[str, str]]:
+    """Expand a mask back to the [{'day', 'time_slot'}] list used in API responses"""
+    slots = []
+    for day_index, day in enumerate(DAYS):
+        for slot_index, time_slot in enumerate(TIME_SLOTS):
+            if mask >> (day_index * len(TIME_SLOTS) + slot_index) & 1:
+                slots.append({'day': day, 'time_slot': time_slot})
+    return slots
+
+def shared_slot_count(mask_a: int, mask_b: int) -> int:
+    return bin(mask_a & mask_b).count('1')
+
+class AvailabilityIndex:
+    """Users grouped by identical availability mask.
+
+    Distinct masks are far fewer than users, so "who is free whenever X is free"
+    is one AND per distinct mask (mask & x == x) rather than string comparisons
+    across every availability row.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._masks: Dict[int, int] = {}
+        self._users_by_mask: Dict[int, Set[int]] = {}
+        self._watermark = 0
+        self._profiles_version = None
+
+    def _set(self, user_id: int, mask: int) -> None:
+        old = self._masks.get(user_id, 0)
+        if old == mask:
+            return
+        if old:
+            users = self._users_by_mask[old]
+            users.discard(user_id)
+            if not users:
+                del self._users_by_mask[old]
+        if mask:
+            self._masks[user_id] = mask
+            self._users_by_mask.setdefault(mask, set()).add(user_id)
+        else:
+            self._masks.pop(user_id, None)
+
+    def add_slot(self, user_id: int, day: str, time_slot: str) -> None:
+        """Record a newly committed availability row"""
+        with self._lock:
+            if self._loaded:
+                self._set(user_id, self._masks.get(user_id, 0) | slot_bit(day, time_slot))
+
+    def mask_for(self, user_id: int) -> int:
+        return self._masks.get(user_id, 0)
+
+    def sync(self, cursor) -> None:
+        """Bring the index up to date; free when no profile write happened since the last sync"""
+        profiles_version = table_versions.get('profiles')
+        with self._lock:
+            if not self._loaded:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM availability")
+                self._watermark = cursor.fetchone()[0]
+                cursor.execute("SELECT id, availability_mask FROM users WHERE availability_mask <> 0")
+                for user_id, mask in cursor.fetchall():
+                    self._set(user_id, mask)
+                self._loaded = True
+            elif profiles_version != self._profiles_version:
+                cursor.execute("""
+                    SELECT a.id, u.id, u.availability_mask
+                    FROM availability a
+                    JOIN users u ON a.user_id = u.id
+                    WHERE a.id > %s
+                """, (max(self._watermark - REFRESH_OVERLAP_ROWS, 0),))
+                for row_id, user_id, mask in cursor.fetchall():
+                    self._set(user_id, mask)
+                    self._watermark = max(self._watermark, row_id)
+            self._profiles_version = profiles_version
+
+    def free_whenever(self, mask: int) -> Set[int]:
+        """Users whose availability covers every slot in mask"""
+        if not mask:
+            return set()
+        with self._lock:
+            users = set()
+            for other, members in self._users_by_mask.items():
+                if other & mask == mask:
+                    users |= members
+            return users
+
+    def overlapping(self, mask: int) -> Set[int]:
+        """Users sharing at least one slot with mask"""
+        with self._lock:
+            users = set()
+            for other, members in self._users_by_mask.items():
+                if other & mask:
+                    users |= members
+            return users
+
+# Global availability index instance
+availability_index = AvailabilityIndex()
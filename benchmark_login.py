@@ -0,0 +1,63 @@
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+from auth_service import AuthService
+from db_pool import DB_CONFIG, get_pool
+from error_handling import AuthenticationException
+
+# Benchmark AuthService.login_user: latency plus the database work each login costs.
+# Statement counts come from the server's Com_select / Com_update counters, so run it
+# against a quiet development database.
+#
+# Usage: python benchmark_login.py <email> <password> [iterations]
+
+def server_counters(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS WHERE Variable_name IN ('Com_select', 'Com_update')")
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return counters
+
+def run(label, auth_service, email, password, iterations, status_conn):
+    pool = get_pool(DB_CONFIG)
+    before = server_counters(status_conn)
+    checkouts_before = pool.stats()['checkouts']
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        try:
+            # A fresh "IP" per call keeps the login rate limiter out of the measurement
+            auth_service.login_user(email, password, ip_address=f"benchmark-{label}-{i}")
+        except AuthenticationException:
+            pass
+        timings.append((time.perf_counter() - started) * 1000)
+    after = server_counters(status_conn)
+    checkouts = pool.stats()['checkouts'] - checkouts_before
+
+    selects = after['Com_select'] - before['Com_select']
+    updates = after['Com_update'] - before['Com_update']
+    print(f"{label}: {iterations} logins")
+    print(f"  per login: {selects / iterations:.2f} SELECT, {updates / iterations:.2f} UPDATE, "
+          f"{checkouts / iterations:.2f} pool checkouts")
+    print(f"  latency: p50 {statistics.median(timings):.1f} ms, "
+          f"p95 {sorted(timings)[int(0.95 * (len(timings) - 1))]:.1f} ms")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python benchmark_login.py <email> <password> [iterations]")
+        sys.exit(1)
+    email, password = sys.argv[1], sys.argv[2]
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    auth_service = AuthService(DB_CONFIG)
+    status_conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        run("successful", auth_service, email, password, iterations, status_conn)
+        # Stay under the lockout threshold so the account is still usable afterwards
+        run("wrong password", auth_service, email, password + "-wrong", 3, status_conn)
+        run("successful after failures", auth_service, email, password, 1, status_conn)
+    finally:
+        status_conn.close()
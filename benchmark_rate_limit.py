@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from error_handling import RateLimiter
+from rate_limit_store import MemoryRateLimitStore, MmapRateLimitStore
+
+# Benchmark RateLimiter per-check overhead for each store, with several worker
+# processes hammering it at once (as gunicorn workers would). Each "check" is the
+# login pattern: is_rate_limited() followed by record_attempt().
+#
+# Usage: python benchmark_rate_limit.py [checks_per_worker] [distinct_keys]
+
+def make_store(backend, path):
+    if backend == 'memory':
+        return MemoryRateLimitStore()
+    return MmapRateLimitStore(path)
+
+def worker(backend, path, worker_id, checks, keys, start, results):
+    limiter = RateLimiter(make_store(backend, path))
+    start.wait()
+    started = time.perf_counter()
+    for i in range(checks):
+        key = f"login_10.0.{worker_id}.{i % keys}"
+        limiter.is_rate_limited(key, 10, 15)
+        limiter.record_attempt(key, 15)
+    results.put(time.perf_counter() - started)
+
+def run(backend, workers, checks, keys):
+    path = os.path.join(tempfile.mkdtemp(), 'rate_limits.bin')
+    make_store(backend, path)  # create the table before the workers race for it
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(backend, path, n, checks, keys, start, results))
+        for n in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(0.2)
+    wall = time.perf_counter()
+    start.set()
+    elapsed = [results.get() for _ in processes]
+    wall = time.perf_counter() - wall
+    for process in processes:
+        process.join()
+    per_check_us = sum(elapsed) / (workers * checks) * 1e6
+    print(f"{backend:>6} x {workers} workers: {per_check_us:6.1f} us/check per worker, "
+          f"{workers * checks / wall:9.0f} checks/s total")
+
+def shared_limit_check(workers):
+    # With a shared store, 10 attempts are allowed in total, however many workers serve them
+    path = os.path.join(tempfile.mkdtemp(), 'rate_limits.bin')
+    limiters = [RateLimiter(MmapRateLimitStore(path)) for _ in range(workers)]
+    allowed = 0
+    for i in range(50):
+        limiter = limiters[i % workers]
+        if not limiter.is_rate_limited('login_203.0.113.7', 10, 15)[0]:
+            limiter.record_attempt('login_203.0.113.7', 15)
+            allowed += 1
+    print(f"shared store: {allowed} of 50 attempts allowed across {workers} workers (limit 10)")
+
+if __name__ == '__main__':
+    checks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for workers in (1, 4, 8):
+        for backend in ('memory', 'mmap'):
+            run(backend, workers, checks, keys)
+    shared_limit_check(4)
@@ -0,0 +1,232 @@
+# Database Pool
+# Process-wide MySQL connection pool shared by app.py, AuthService and admin_service
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+import logging
+
+import mysql.connector
+from mysql.connector import errors as mysql_errors
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'user': os.getenv('DB_USER', 'root'),
+    'password': os.getenv('DB_PASSWORD', 'ShreeKrishna@7'),
+    'database': os.getenv('DB_NAME', 'skill_swap')
+}
+
+class PoolConfig:
+    """Pool configuration settings"""
+
+    POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    # Seconds a request waits for a free connection before failing
+    CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+    # Connections idle for longer than this are pinged before being handed out
+    VALIDATE_AFTER_SECONDS = float(os.getenv('DB_POOL_VALIDATE_AFTER', 5))
+
+class PooledConnection:
+    """Proxy around a raw MySQL connection that returns it to the pool on close()"""
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        connection = self.__dict__.get('_connection')
+        if connection is None:
+            raise mysql_errors.OperationalError("Connection has already been returned to the pool")
+        return getattr(connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # Safety net for handlers that return early without closing
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Give the connection back to the pool (idempotent)"""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection)
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of MySQL connections with checkout validation"""
+
+    def __init__(self, db_config: Dict[str, str], size: int = PoolConfig.POOL_SIZE,
+                 timeout: float = PoolConfig.CHECKOUT_TIMEOUT,
+                 validate_after: float = PoolConfig.VALIDATE_AFTER_SECONDS):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.db_config = dict(db_config)
+        self.size = size
+        self.timeout = timeout
+        self.validate_after = validate_after
+
+        # RLock so a PooledConnection finalizer running mid-acquire cannot deadlock
+        self._cond = threading.Condition(threading.RLock())
+        self._idle = deque()  # (connection, returned_at)
+        self._created = 0
+
+        self._checkouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def _connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _is_usable(self, connection, returned_at: float) -> bool:
+        if time.monotonic() - returned_at < self.validate_after:
+            return True
+        try:
+            return connection.is_connected()
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a validated connection, waiting up to `timeout` seconds for one to free up"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            connection = None
+            returned_at = 0.0
+            create = False
+
+            with self._cond:
+                while not self._idle and self._created >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise mysql_errors.PoolError(
+                            f"Timed out after {timeout:.1f}s waiting for a database connection"
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                else:
+                    self._created += 1
+                    create = True
+
+            if create:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._created -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_usable(connection, returned_at):
+                self._discard(connection)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+                if waited > 0.001:
+                    self._waits += 1
+
+            return PooledConnection(self, connection)
+
+    def release(self, connection) -> None:
+        """Return a raw connection to the pool, rolling back any open transaction"""
+        try:
+            connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding pooled connection that failed cleanup: {e}")
+            self._discard(connection)
+            return
+
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks out a connection and always gives it back"""
+        conn = self.get_connection(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and checkout wait times"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self.size,
+                'open_connections': self._created,
+                'idle': idle,
+                'in_use': self._created - idle,
+                'checkouts': self._checkouts,
+                'waited_checkouts': self._waits,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'avg_wait_ms': round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+                'total_wait_ms': round(self._total_wait * 1000, 3)
+            }
+
+    def close_all(self) -> None:
+        """Close every idle connection (checked-out connections are closed on return)"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+_pools: Dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_config: Dict[str, str] = None) -> ConnectionPool:
+    """Return the process-wide pool for a database configuration"""
+    db_config = db_config or DB_CONFIG
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_config)
+            _pools[key] = pool
+        return pool
+
+def get_db_connection() -> PooledConnection:
+    """Check out a connection from the shared pool; close() returns it"""
+    return get_pool().get_connection()
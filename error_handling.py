@@ -1,4 +1,5 @@
 import logging
+import time
 import traceback
 from functools import wraps
 from datetime import datetime
@@ -6,6 +7,8 @@ from typing import Dict, Any, Optional, Tuple
 from flask import jsonify, request
 import mysql.connector
 
+from rate_limit_store import MemoryRateLimitStore, create_rate_limit_store
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -113,6 +116,13 @@ class RateLimitException(SkillSwapException):
         details = {'retry_after': retry_after} if retry_after else {}
         super().__init__(message, ErrorCodes.RATE_LIMIT_EXCEEDED, 429, details)
 
+class ServiceUnavailableException(SkillSwapException):
+    """Exception for requests shed because a bounded resource is saturated"""
+    
+    def __init__(self, message: str, retry_after: int = None):
+        details = {'retry_after': retry_after} if retry_after else {}
+        super().__init__(message, ErrorCodes.SERVICE_UNAVAILABLE, 503, details)
+
 class ErrorHandler:
     """Centralized error handling utilities"""
     
@@ -277,41 +287,43 @@ def validate_request_data(required_fields: list, optional_fields: list = None) -
 
 # Rate limiting utilities
 class RateLimiter:
-    """Simple in-memory rate limiter"""
+    """Thread-safe sliding-window rate limiter over a pluggable counter store.
+    
+    Each key keeps two counters (this fixed window and the previous one); the
+    previous count is weighted by how much of it still overlaps the sliding
+    window. That is O(1) state and O(1) work per check, whatever the attempt
+    rate. The store (see rate_limit_store.py) decides where counters live and
+    bounds their memory: in this process, or shared by every worker on the host.
+    """
     
-    def __init__(self):
-        self.attempts = {}
+    def __init__(self, store=None):
+        self.store = store or MemoryRateLimitStore()
     
     def is_rate_limited(self, key: str, max_attempts: int, window_minutes: int) -> Tuple[bool, int]:
         """Check if key is rate limited"""
-        now = datetime.utcnow()
-        window_start = now.timestamp() - (window_minutes * 60)
+        window = window_minutes * 60
+        now = time.time()
+        window_start, current, previous = self.store.touch(key, window, now)
+        elapsed = now - window_start
+        estimate = previous * (1 - elapsed / window) + current
+        if estimate < max_attempts:
+            return False, 0
         
-        if key not in self.attempts:
-            self.attempts[key] = []
-        
-        # Clean old attempts
-        self.attempts[key] = [
-            attempt for attempt in self.attempts[key] 
-            if attempt > window_start
-        ]
-        
-        current_attempts = len(self.attempts[key])
-        
-        if current_attempts >= max_attempts:
-            # Calculate retry after time
-            oldest_attempt = min(self.attempts[key])
-            retry_after = int((oldest_attempt + (window_minutes * 60)) - now.timestamp())
-            return True, max(retry_after, 1)
-        
-        return False, 0
+        # Seconds until the weighted estimate drops back under the limit
+        if current >= max_attempts:
+            # Only once this window has become the (decaying) previous one
+            retry_after = (window - elapsed) + window * (1 - max_attempts / current)
+        else:
+            retry_after = min(window - elapsed,
+                              window * (1 - (max_attempts - current) / previous) - elapsed)
+        return True, int(retry_after) + 1
+    
+    def record_attempt(self, key: str, window_minutes: Optional[int] = None):
+        """Record an attempt for the key (in the window it was last checked with)"""
+        self.store.touch(key, window_minutes * 60 if window_minutes else None, time.time(), 1)
     
-    def record_attempt(self, key: str):
-        """Record an attempt for the key"""
-        now = datetime.utcnow().timestamp()
-        if key not in self.attempts:
-            self.attempts[key] = []
-        self.attempts[key].append(now)
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
 
 # Global rate limiter instance
-rate_limiter = RateLimiter()
+rate_limiter = RateLimiter(create_rate_limit_store())
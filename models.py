@@ -91,7 +91,7 @@ class EmailVerificationToken(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
-    token = db.Column(db.String(255), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the emailed token
     expires_at = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     used_at = db.Column(db.DateTime, nullable=True)
@@ -103,7 +103,7 @@ class PasswordResetToken(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
-    token = db.Column(db.String(255), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the emailed token
     expires_at = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     used_at = db.Column(db.DateTime, nullable=True)
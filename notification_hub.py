@@ -0,0 +1,408 @@
+# Notification Hub
+# Fans new notifications out to Server-Sent Events connections across worker processes
+
+import json
+import mmap
+import os
+import secrets
+import struct
+import tempfile
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from db_pool import DB_CONFIG, get_pool
+from announcements import banned_user_ids
+from notification_stats import get_unread_count, get_unread_counts
+
+try:
+    import fcntl
+except ImportError:  # Windows: events still reach connections held by the publishing process
+    fcntl = None
+
+MAGIC = b'SSNQ'
+HEADER = struct.Struct('<4s4xQQ')  # magic, padding, generation, next sequence number
+ENTRY = struct.Struct('<QIIQ')  # sequence, kind, user_id, notification_id
+RING_SIZE = 4096
+
+# Event kinds carried by the ring
+NEW_NOTIFICATION = 1  # notification_id was created for user_id
+NOTIFICATIONS_READ = 2  # user_id marked notifications read; re-count unread
+BROADCAST = 3  # an announcement (notification_id = announcement id) was published to everyone
+
+HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+POLL_INTERVAL_SECONDS = float(os.getenv('SSE_POLL_INTERVAL_SECONDS', 0.5))
+CONNECTION_BUFFER_SIZE = int(os.getenv('SSE_CONNECTION_BUFFER_SIZE', 100))
+
+def _format_notification(row) -> Dict[str, Any]:
+    notification_id, notif_type, title, message, is_read, related_request_id, created_at = row
+    return {
+        'id': notification_id,
+        'type': notif_type,
+        'title': title,
+        'message': message,
+        'is_read': bool(is_read),
+        'related_request_id': related_request_id,
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+def _format_announcement(row) -> Dict[str, Any]:
+    announcement_id, title, message, created_at = row
+    return {
+        'id': f'announcement-{announcement_id}',
+        'type': 'announcement',
+        'title': title,
+        'message': message,
+        'is_read': False,
+        'related_request_id': None,
+        'created_at': created_at.isoformat() if created_at else None
+    }
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[int, Optional[int]]]:
+    """Parse a Last-Event-ID of the form "<notification id>-<announcement id>" (or a bare
+    notification id); raises ValueError if malformed"""
+    if not value:
+        return None
+    notification_id, _, announcement_id = value.partition('-')
+    return int(notification_id), (int(announcement_id) if announcement_id else None)
+
+class EventRing:
+    """Fixed-size ring of (kind, user_id, notification_id) events in a memory-mapped file.
+
+    Publishers append under an exclusive file lock; readers compare the shared
+    sequence number with their own, so a process with nothing new to deliver
+    only reads eight bytes. A reader that falls more than RING_SIZE events
+    behind is told so and must resynchronize from the database.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        size = HEADER.size + ENTRY.size * RING_SIZE
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._flock(fd, True)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, HEADER.pack(MAGIC, secrets.randbits(64), 0))
+            finally:
+                self._flock(fd, False)
+            self._map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+        magic, self.generation, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a notification event ring")
+
+    @staticmethod
+    def _flock(fd: int, exclusive: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    def head(self) -> int:
+        """Sequence number the next event will get"""
+        return HEADER.unpack_from(self._map, 0)[2]
+
+    def append(self, kind: int, user_id: int = 0, notification_id: int = 0) -> None:
+        with self._lock:
+            self._flock(self._fd, True)
+            try:
+                seq = self.head()
+                ENTRY.pack_into(self._map, HEADER.size + ENTRY.size * (seq % RING_SIZE),
+                                seq, kind, user_id, notification_id)
+                HEADER.pack_into(self._map, 0, MAGIC, self.generation, seq + 1)
+            finally:
+                self._flock(self._fd, False)
+
+    def read_since(self, seq: int) -> Tuple[List[Tuple[int, int, int]], int, bool]:
+        """Events from seq on: (events, new_seq, overflowed)"""
+        head = self.head()
+        if head <= seq:
+            return [], head, False
+        overflowed = head - seq > RING_SIZE
+        events = []
+        for s in range(max(seq, head - RING_SIZE), head):
+            entry_seq, kind, user_id, notification_id = ENTRY.unpack_from(
+                self._map, HEADER.size + ENTRY.size * (s % RING_SIZE))
+            if entry_seq != s:
+                # Overwritten while we were reading; the caller resynchronizes
+                overflowed = True
+                continue
+            events.append((kind, user_id, notification_id))
+        return events, head, overflowed
+
+class NotificationConnection:
+    """One SSE client: a bounded outbound buffer plus the cursors it has been sent up to"""
+
+    def __init__(self, user_id: int, last_event_id: Optional[int], last_announcement_id: Optional[int],
+                 buffer_size: int):
+        self.user_id = user_id
+        self.last_event_id = last_event_id
+        self.last_announcement_id = last_announcement_id
+        self.unread_count: Optional[int] = None
+        self.overflowed = False
+        self.closed = False
+        self._buffer: deque = deque()
+        self._buffer_size = buffer_size
+        self._cond = threading.Condition()
+
+    @property
+    def event_id(self) -> str:
+        return f"{self.last_event_id}-{self.last_announcement_id}"
+
+    def push(self, event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> None:
+        with self._cond:
+            if len(self._buffer) >= self._buffer_size:
+                # Slow reader: drop what is queued and ask the client to refetch instead
+                self._buffer.clear()
+                self.overflowed = True
+            else:
+                self._buffer.append((event, data, event_id))
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def next_batch(self, timeout: float) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+        with self._cond:
+            if not self._buffer and not self.overflowed and not self.closed:
+                self._cond.wait(timeout)
+            if self.overflowed:
+                self.overflowed = False
+                return [('resync', {}, None)]
+            batch = list(self._buffer)
+            self._buffer.clear()
+            return batch
+
+class NotificationHub:
+    """Per-process registry of SSE connections fed from the shared event ring.
+
+    One watcher thread per process checks the ring; when events name users
+    with open connections here, their new rows are fetched in one batched
+    query. Users without new events cost nothing, and connected users with
+    nothing new cost only the heartbeat.
+    """
+
+    def __init__(self, ring: EventRing, buffer_size: int = CONNECTION_BUFFER_SIZE):
+        self.ring = ring
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self._connections: Dict[int, Set[NotificationConnection]] = {}
+        self._wakeup = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._seq = ring.head()
+
+        self._pushed = 0
+        self._resyncs = 0
+
+    # Publishing (call after the writing transaction commits)
+
+    def publish_notification(self, user_id: int, notification_id: int) -> None:
+        self.ring.append(NEW_NOTIFICATION, user_id, notification_id)
+        self._wakeup.set()
+
+    def publish_read(self, user_id: int) -> None:
+        self.ring.append(NOTIFICATIONS_READ, user_id)
+        self._wakeup.set()
+
+    def publish_announcement(self, announcement_id: int) -> None:
+        self.ring.append(BROADCAST, 0, announcement_id)
+        self._wakeup.set()
+
+    # Connections
+
+    def connect(self, user_id: int, last_event_id: Optional[Tuple[int, Optional[int]]]) -> NotificationConnection:
+        """Register a connection and queue its catch-up events.
+
+        A fresh connection starts after the user's newest notification and the
+        newest announcement, with the current unread count; a resumed one
+        (Last-Event-ID) first receives what it missed, newest buffer-full only.
+        """
+        notification_id, announcement_id = last_event_id or (None, None)
+        connection = NotificationConnection(user_id, notification_id, announcement_id, self.buffer_size)
+        if notification_id is None or announcement_id is None:
+            with get_pool(DB_CONFIG).connection() as conn:
+                cursor = conn.cursor()
+                if notification_id is None:
+                    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM notifications WHERE user_id = %s", (user_id,))
+                    connection.last_event_id = cursor.fetchone()[0]
+                    connection.unread_count = get_unread_count(cursor, user_id)
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM announcements")
+                connection.last_announcement_id = cursor.fetchone()[0]
+                cursor.close()
+            if connection.unread_count is not None:
+                connection.push('unread_count', {'unread_count': connection.unread_count})
+
+        with self._lock:
+            self._connections.setdefault(user_id, set()).add(connection)
+            self._ensure_watcher()
+        # Anything created between the query above and registering is picked up here
+        self._deliver({user_id: [connection]}, recount=set(), announcements=True)
+        return connection
+
+    def disconnect(self, connection: NotificationConnection) -> None:
+        connection.close()
+        with self._lock:
+            connections = self._connections.get(connection.user_id)
+            if connections:
+                connections.discard(connection)
+                if not connections:
+                    del self._connections[connection.user_id]
+
+    def _ensure_watcher(self) -> None:
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch, name='notification-hub', daemon=True)
+            self._watcher.start()
+
+    def _watch(self) -> None:
+        while True:
+            self._wakeup.wait(POLL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            try:
+                self._poll()
+            except Exception as e:  # keep the watcher alive; connections resync on the next event
+                print(f"Notification hub poll failed: {e}")
+
+    def _poll(self) -> None:
+        events, self._seq, overflowed = self.ring.read_since(self._seq)
+        if not events and not overflowed:
+            return
+
+        with self._lock:
+            if not self._connections:
+                return
+            if overflowed or any(kind == BROADCAST for kind, _, _ in events):
+                targets = set(self._connections)
+            else:
+                targets = {user_id for _, user_id, _ in events if user_id in self._connections}
+            if not targets:
+                return
+            recount = {user_id for kind, user_id, _ in events
+                       if kind == NOTIFICATIONS_READ and user_id in targets}
+            if overflowed:
+                recount = set(targets)
+            connections = {user_id: list(self._connections.get(user_id, ())) for user_id in targets}
+        announcements = overflowed or any(kind == BROADCAST for kind, _, _ in events)
+        self._deliver(connections, recount, announcements)
+
+    def _deliver(self, connections: Dict[int, List[NotificationConnection]], recount: Set[int],
+                 announcements: bool = False) -> None:
+        """Fetch new rows (and unread counts where needed) for these users and queue them"""
+        # Serialized so a connection's cursors never move under a concurrent delivery
+        with self._deliver_lock:
+            self._deliver_locked(connections, recount, announcements)
+
+    def _deliver_locked(self, connections: Dict[int, List[NotificationConnection]], recount: Set[int],
+                        announcements: bool) -> None:
+        user_ids = [user_id for user_id, conns in connections.items() if conns]
+        if not user_ids:
+            return
+        new_announcements: List[tuple] = []
+        banned: Set[int] = set()
+        cursors = {user_id: min(c.last_event_id for c in connections[user_id]) for user_id in user_ids}
+        placeholders = ', '.join(['%s'] * len(user_ids))
+
+        with get_pool(DB_CONFIG).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT user_id, id, type, title, message, is_read, related_request_id, created_at
+                FROM notifications
+                WHERE user_id IN ({placeholders}) AND id > %s
+                ORDER BY id
+            """, user_ids + [min(cursors.values())])
+            rows: Dict[int, List[tuple]] = {}
+            for row in cursor.fetchall():
+                if row[1] > cursors[row[0]]:
+                    rows.setdefault(row[0], []).append(row[1:])
+
+            if announcements:
+                # One query serves every connection: announcements are the same for everyone
+                cursor.execute("""
+                    SELECT id, title, message, created_at FROM announcements
+                    WHERE id > %s ORDER BY id DESC LIMIT %s
+                """, (min(c.last_announcement_id for conns in connections.values() for c in conns),
+                      self.buffer_size))
+                new_announcements = cursor.fetchall()[::-1]
+                if new_announcements:
+                    banned = banned_user_ids(cursor, user_ids)
+
+            counts = {}
+            need_count = [user_id for user_id in user_ids
+                          if user_id in recount or any(c.unread_count is None for c in connections[user_id])]
+            if need_count:
+                counts = get_unread_counts(cursor, need_count)
+            cursor.close()
+
+        for user_id in user_ids:
+            for connection in connections[user_id]:
+                new_rows = [row for row in rows.get(user_id, ()) if row[0] > connection.last_event_id]
+                # Only the newest rows fit in the buffer; older ones are in GET /notifications
+                for row in new_rows[-self.buffer_size:]:
+                    connection.last_event_id = row[0]
+                    connection.push('notification', _format_notification(row), connection.event_id)
+                    self._pushed += 1
+
+                fresh = [row for row in new_announcements if row[0] > connection.last_announcement_id]
+                if user_id in banned:
+                    if fresh:
+                        connection.last_announcement_id = fresh[-1][0]
+                    fresh = []
+                for row in fresh:
+                    connection.last_announcement_id = row[0]
+                    connection.push('notification', _format_announcement(row), connection.event_id)
+                    self._pushed += 1
+
+                if user_id in counts:
+                    unread = counts[user_id]
+                elif connection.unread_count is not None:
+                    unread = connection.unread_count + sum(1 for row in new_rows if not row[4]) + len(fresh)
+                else:
+                    unread = None
+                if unread is not None and unread != connection.unread_count:
+                    connection.unread_count = unread
+                    connection.push('unread_count', {'unread_count': unread})
+
+    def stream(self, connection: NotificationConnection) -> Iterator[str]:
+        """SSE body for one connection; ends (and unregisters) when the client goes away"""
+        try:
+            yield "retry: 3000\n\n"
+            while not connection.closed:
+                batch = connection.next_batch(HEARTBEAT_SECONDS)
+                if not batch:
+                    yield ": heartbeat\n\n"
+                    continue
+                chunks = []
+                for event, data, event_id in batch:
+                    if event == 'resync':
+                        self._resyncs += 1
+                    lines = f"event: {event}\n"
+                    if event_id is not None:
+                        lines += f"id: {event_id}\n"
+                    chunks.append(lines + f"data: {json.dumps(data, separators=(',', ':'))}\n\n")
+                yield ''.join(chunks)
+        finally:
+            self.disconnect(connection)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'connected_users': len(self._connections),
+                'connections': sum(len(conns) for conns in self._connections.values()),
+                'ring_head': self.ring.head(),
+                'ring_seen': self._seq,
+                'pushed': self._pushed,
+                'resyncs': self._resyncs
+            }
+
+# Global notification hub instance
+notification_hub = NotificationHub(EventRing(
+    os.getenv('NOTIFICATION_RING_FILE', os.path.join(tempfile.gettempdir(), 'skillswap_notification_ring.bin'))
+))
@@ -0,0 +1,125 @@
+# Notification Stats
+# Per-user unread notification counters kept in user_notification_stats
+
+import bisect
+from typing import Dict, Iterable
+
+from announcements import BANNED_NAME_PATTERN, banned_user_ids
+from db_pool import DB_CONFIG, get_pool
+
+# Counters are changed inside the caller's transaction, next to the notifications
+# write they describe, so a rollback undoes both. A missing row means zero.
+# Unread totals add the announcements above the user's last-seen watermark
+# (see announcements.py), which are never counted per user, and which banned
+# users do not get.
+
+def record_unread(cursor, user_id: int, count: int = 1) -> None:
+    """Count `count` new unread notifications for user_id"""
+    cursor.execute("""
+        INSERT INTO user_notification_stats (user_id, unread_count) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE unread_count = unread_count + VALUES(unread_count)
+    """, (user_id, count))
+
+def record_read(cursor, user_id: int, count: int = 1) -> None:
+    """Count `count` notifications of user_id as read; never goes below zero"""
+    cursor.execute("""
+        UPDATE user_notification_stats
+        SET unread_count = unread_count - LEAST(unread_count, %s)
+        WHERE user_id = %s
+    """, (count, user_id))
+
+def clear_unread(cursor, user_id: int) -> None:
+    cursor.execute("UPDATE user_notification_stats SET unread_count = 0 WHERE user_id = %s", (user_id,))
+
+def get_unread_count(cursor, user_id: int) -> int:
+    """Unread personal notifications plus unseen announcements, in one statement"""
+    cursor.execute("""
+        SELECT s.unread_count + (
+            SELECT COUNT(*) FROM announcements a
+            WHERE a.id > s.seen AND NOT EXISTS (SELECT 1 FROM users u WHERE u.id = %s AND u.name LIKE %s)
+        )
+        FROM (
+            SELECT COALESCE(MAX(unread_count), 0) AS unread_count,
+                   COALESCE(MAX(last_seen_announcement_id), 0) AS seen
+            FROM user_notification_stats WHERE user_id = %s
+        ) s
+    """, (user_id, BANNED_NAME_PATTERN, user_id))
+    return int(cursor.fetchone()[0])
+
+def get_unread_counts(cursor, user_ids: Iterable[int]) -> Dict[int, int]:
+    """Unread counts for several users in one query (zero for users without a row)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    cursor.execute(f"""
+        SELECT user_id, unread_count, last_seen_announcement_id
+        FROM user_notification_stats WHERE user_id IN ({placeholders})
+    """, user_ids)
+    stats = {user_id: (unread, seen) for user_id, unread, seen in cursor.fetchall()}
+
+    lowest_seen = min(stats.get(user_id, (0, 0))[1] for user_id in user_ids)
+    cursor.execute("SELECT id FROM announcements WHERE id > %s ORDER BY id", (lowest_seen,))
+    announcement_ids = [row[0] for row in cursor.fetchall()]
+
+    banned = banned_user_ids(cursor, user_ids)
+    counts = {}
+    for user_id in user_ids:
+        unread, seen = stats.get(user_id, (0, 0))
+        if user_id in banned:
+            counts[user_id] = unread
+        else:
+            counts[user_id] = unread + len(announcement_ids) - bisect.bisect_right(announcement_ids, seen)
+    return counts
+
+def reconcile_unread_counts(batch_size: int = 1000) -> int:
+    """Repair counter drift from the notifications table; returns the number of users corrected.
+
+    Each batch locks its range of counter rows (FOR UPDATE also takes the gaps,
+    so no counter row can appear mid-batch) before counting, so a concurrent
+    writer either finishes first and is counted, or waits and applies its
+    increment on top of the repaired value.
+    """
+    pool = get_pool(DB_CONFIG)
+    corrected = 0
+    last_id = 0
+    while True:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE id > %s ORDER BY id LIMIT %s", (last_id, batch_size))
+            user_ids = [row[0] for row in cursor.fetchall()]
+            if not user_ids:
+                cursor.close()
+                break
+            low, high = user_ids[0], user_ids[-1]
+
+            cursor.execute("""
+                SELECT user_id, unread_count FROM user_notification_stats
+                WHERE user_id BETWEEN %s AND %s FOR UPDATE
+            """, (low, high))
+            stored = dict(cursor.fetchall())
+
+            cursor.execute("""
+                SELECT user_id, COUNT(*) FROM notifications
+                WHERE user_id BETWEEN %s AND %s AND is_read = FALSE
+                GROUP BY user_id
+            """, (low, high))
+            actual = dict(cursor.fetchall())
+
+            repairs = [(user_id, actual.get(user_id, 0)) for user_id in user_ids
+                       if stored.get(user_id, 0) != actual.get(user_id, 0)]
+            if repairs:
+                cursor.executemany("""
+                    INSERT INTO user_notification_stats (user_id, unread_count) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE unread_count = VALUES(unread_count)
+                """, repairs)
+            conn.commit()
+            cursor.close()
+
+        corrected += len(repairs)
+        last_id = high
+        print(f"Reconciled unread counts through user {last_id} ({corrected} corrected)")
+    return corrected
+
+if __name__ == '__main__':
+    reconcile_unread_counts()
@@ -0,0 +1,154 @@
+# Password Hashing
+# bcrypt hashing and verification in a bounded process pool, off the request threads
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+import bcrypt
+
+from error_handling import ServiceUnavailableException
+
+# Each bcrypt call is ~250 ms of CPU. Running it in worker processes keeps it from
+# holding the GIL over every other request thread, and the pending limit turns a
+# login burst into fast 503s instead of a queue that grows until everything times out.
+HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 16))  # waiting beyond the running ones
+HASH_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+RETRY_AFTER_SECONDS = 2
+
+# Latency percentiles are taken over this many recent calls
+LATENCY_SAMPLES = 1000
+
+def _hash(password: bytes) -> Tuple[bytes, float, float]:
+    started = time.time()
+    hashed = bcrypt.hashpw(password, bcrypt.gensalt())
+    return hashed, started, time.time()
+
+def _check(password: bytes, stored: bytes) -> Tuple[bool, float, float]:
+    started = time.time()
+    matches = bcrypt.checkpw(password, stored)
+    return matches, started, time.time()
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class PasswordHasher:
+    """Bounded pool of bcrypt worker processes.
+
+    At most `workers + queue_limit` calls are admitted at once; one more is
+    rejected immediately with a 503 rather than queued. Queue wait (submit to
+    start in a worker) and hash time are recorded separately, so a saturated
+    pool shows up as wait time, not as slow bcrypt.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, timeout: float):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._wait_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+        self._hash_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Started on first use, so importing the module (or forking workers) spawns nothing
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceUnavailableException(
+                "The server is busy processing logins. Please try again in a moment.",
+                RETRY_AFTER_SECONDS
+            )
+        with self._lock:
+            self._in_flight += 1
+        executor = self._pool()
+        submitted = time.time()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is held until the worker finishes, not until the caller stops
+        # waiting, so timed-out calls still count against the bound
+        future.add_done_callback(self._release)
+        try:
+            result, started, finished = future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # A worker died (OOM, killed); start a fresh pool for the next caller
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise ServiceUnavailableException("Password service restarting. Please try again.",
+                                              RETRY_AFTER_SECONDS)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise ServiceUnavailableException("Password check timed out. Please try again.",
+                                              RETRY_AFTER_SECONDS)
+        with self._lock:
+            self._completed += 1
+            self._wait_ms.append(max(0.0, started - submitted) * 1000)
+            self._hash_ms.append((finished - started) * 1000)
+        return result
+
+    def hash_password(self, password: str) -> bytes:
+        """bcrypt hash (with a fresh salt) of password"""
+        return self._run(_hash, password.encode('utf-8'))
+
+    def check_password(self, password: str, stored_hash) -> bool:
+        """Whether password matches a stored bcrypt hash (bytes or str)"""
+        if isinstance(stored_hash, str):
+            stored_hash = stored_hash.encode('utf-8')
+        return self._run(_check, password.encode('utf-8'), stored_hash)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wait_ms, hash_ms = list(self._wait_ms), list(self._hash_ms)
+            return {
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.workers),
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts,
+                'queue_wait_ms': {
+                    'p50': round(_percentile(wait_ms, 0.5), 2),
+                    'p95': round(_percentile(wait_ms, 0.95), 2),
+                    'max': round(max(wait_ms, default=0.0), 2)
+                },
+                'hash_ms': {
+                    'p50': round(_percentile(hash_ms, 0.5), 2),
+                    'p95': round(_percentile(hash_ms, 0.95), 2),
+                    'max': round(max(hash_ms, default=0.0), 2)
+                }
+            }
+
+# Global password hasher instance
+password_hasher = PasswordHasher(HASH_WORKERS, HASH_QUEUE_LIMIT, HASH_TIMEOUT_SECONDS)
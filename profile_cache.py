@@ -0,0 +1,96 @@
+# Profile Cache
+# In-process LRU of pre-encoded public profile JSON fragments
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Rough per-entry bookkeeping cost (dict slot, key, tuple) counted against the ceiling
+ENTRY_OVERHEAD_BYTES = 120
+
+class ProfileCache:
+    """Thread-safe LRU of encoded profile fragments with a memory ceiling.
+
+    Entries are tagged with the snapshot version they were encoded from, so a
+    worker that missed an explicit eviction (another process handled the write)
+    still treats the stale fragment as a miss.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[int, Tuple[int, bytes]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def encode(profile: Dict[str, Any]) -> bytes:
+        """Encode a profile dict as a compact JSON fragment"""
+        return json.dumps(profile, separators=(',', ':')).encode('utf-8')
+
+    def _remove(self, user_id: int) -> bool:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        self._bytes -= len(entry[1]) + ENTRY_OVERHEAD_BYTES
+        return True
+
+    def get(self, user_id: int, version: int) -> Optional[bytes]:
+        """Return the cached fragment if it was encoded from `version`"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] != version:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, user_id: int, version: int, fragment: bytes) -> None:
+        """Store a fragment, evicting least recently used entries to stay under the ceiling"""
+        size = len(fragment) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(user_id)
+            self._entries[user_id] = (version, fragment)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self._evictions += 1
+
+    def evict(self, user_ids: Iterable[int]) -> None:
+        """Drop entries for users whose profile just changed"""
+        with self._lock:
+            for user_id in user_ids:
+                if self._remove(user_id):
+                    self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations
+            }
+
+# Global profile cache instance
+profile_cache = ProfileCache(int(os.getenv('PROFILE_CACHE_MAX_BYTES', 32 * 1024 * 1024)))
@@ -0,0 +1,178 @@
+# Profile Snapshots
+# Denormalized, ready-to-serve profile documents kept in the profile_snapshots table
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import mysql.connector
+
+from db_pool import DB_CONFIG, get_pool
+from availability import mask_to_slots
+
+BACKFILL_BATCH_SIZE = 500
+
+def build_profile_documents(cursor, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Build profile documents for a set of users with one set-based query per table"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    documents = {}
+
+    # Availability is rendered from the packed mask, so the availability table is not read
+    cursor.execute(f"""
+        SELECT id, name, email, location, is_public, availability_mask, created_at
+        FROM users
+        WHERE id IN ({placeholders})
+    """, user_ids)
+    for user_id, name, email, location, is_public, availability_mask, created_at in cursor.fetchall():
+        documents[user_id] = {
+            'id': user_id,
+            'name': name,
+            'email': email,
+            'location': location,
+            'is_public': bool(is_public),
+            'offered_skills': [],
+            'wanted_skills': [],
+            'availability': mask_to_slots(availability_mask),
+            'created_at': created_at.isoformat() if created_at else None
+        }
+
+    cursor.execute(f"""
+        SELECT uso.user_id, s.id, s.name, uso.proficiency_level
+        FROM user_skills_offered uso
+        JOIN skills s ON uso.skill_id = s.id
+        WHERE uso.user_id IN ({placeholders})
+    """, user_ids)
+    for user_id, skill_id, skill_name, proficiency in cursor.fetchall():
+        if user_id in documents:
+            documents[user_id]['offered_skills'].append(
+                {'id': skill_id, 'name': skill_name, 'proficiency': proficiency}
+            )
+
+    cursor.execute(f"""
+        SELECT usw.user_id, s.id, s.name, usw.desired_level
+        FROM user_skills_wanted usw
+        JOIN skills s ON usw.skill_id = s.id
+        WHERE usw.user_id IN ({placeholders})
+    """, user_ids)
+    for user_id, skill_id, skill_name, desired_level in cursor.fetchall():
+        if user_id in documents:
+            documents[user_id]['wanted_skills'].append(
+                {'id': skill_id, 'name': skill_name, 'desired_level': desired_level}
+            )
+
+    return documents
+
+def _upsert_snapshots(cursor, documents: Dict[int, Dict[str, Any]]) -> None:
+    rows = []
+    for user_id, document in documents.items():
+        created_at = document['created_at']
+        rows.append((
+            user_id,
+            document['is_public'],
+            bool(document['offered_skills'] or document['wanted_skills']),
+            datetime.fromisoformat(created_at) if created_at else None,
+            json.dumps(document, separators=(',', ':'))
+        ))
+    if not rows:
+        return
+
+    cursor.executemany("""
+        INSERT INTO profile_snapshots (user_id, is_public, has_skills, created_at, document)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            is_public = VALUES(is_public),
+            has_skills = VALUES(has_skills),
+            created_at = VALUES(created_at),
+            document = VALUES(document),
+            version = version + 1
+    """, rows)
+
+def rebuild_profile_snapshot(cursor, user_id: int) -> Optional[Dict[str, Any]]:
+    """Rebuild one user's snapshot row on the caller's cursor (and therefore its transaction)"""
+    documents = build_profile_documents(cursor, [user_id])
+    document = documents.get(user_id)
+    if document is None:
+        cursor.execute("DELETE FROM profile_snapshots WHERE user_id = %s", (user_id,))
+        return None
+
+    _upsert_snapshots(cursor, documents)
+    return document
+
+def skill_user_ids(cursor, skill_id: int) -> List[int]:
+    """Users offering or wanting a skill, i.e. whose snapshots change if it is deleted"""
+    cursor.execute("""
+        SELECT user_id FROM user_skills_offered WHERE skill_id = %s
+        UNION
+        SELECT user_id FROM user_skills_wanted WHERE skill_id = %s
+    """, (skill_id, skill_id))
+    return [row[0] for row in cursor.fetchall()]
+
+def rebuild_profile_snapshots(cursor, user_ids: Iterable[int]) -> None:
+    """Rebuild several users' snapshot rows with set-based queries, on the caller's transaction"""
+    _upsert_snapshots(cursor, build_profile_documents(cursor, user_ids))
+
+def load_profile_snapshot(cursor, user_id: int) -> Optional[Dict[str, Any]]:
+    """Read one user's snapshot document, or None if it has not been built yet"""
+    cursor.execute("SELECT document FROM profile_snapshots WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return json.loads(row[0]) if row else None
+
+def to_listing_profile(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a snapshot document onto the public listing shape used by /profiles"""
+    return {
+        'id': document['id'],
+        'name': document['name'],
+        'email': document['email'],
+        'location': document['location'],
+        'offered_skills': [
+            {'name': skill['name'], 'proficiency': skill['proficiency']}
+            for skill in document['offered_skills']
+        ],
+        'wanted_skills': [
+            {'name': skill['name'], 'desired_level': skill['desired_level']}
+            for skill in document['wanted_skills']
+        ],
+        'availability': document['availability'],
+        'created_at': document['created_at']
+    }
+
+def backfill_profile_snapshots(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Build snapshot rows for every existing user, committing one id-ordered batch at a time"""
+    total = 0
+    last_id = 0
+
+    with get_pool(DB_CONFIG).connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute("""
+                SELECT id FROM users
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, batch_size))
+            batch = [row[0] for row in cursor.fetchall()]
+            if not batch:
+                break
+
+            documents = build_profile_documents(cursor, batch)
+            _upsert_snapshots(cursor, documents)
+            conn.commit()
+
+            total += len(documents)
+            last_id = batch[-1]
+            print(f"Backfilled {total} profile snapshots (up to user {last_id})")
+
+        cursor.close()
+
+    return total
+
+if __name__ == '__main__':
+    try:
+        count = backfill_profile_snapshots()
+        print(f"Profile snapshot backfill complete: {count} users")
+    except mysql.connector.Error as e:
+        print(f"Database error: {e}")
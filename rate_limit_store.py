@@ -0,0 +1,206 @@
+# Rate Limit Store
+# Sliding-window counter storage for error_handling.RateLimiter: per process, or shared by every worker on the host
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: counters are still correct within a single process
+    fcntl = None
+
+# A key's state is two fixed-window counts: the window containing `now` and the one
+# before it. Keys idle for two windows can no longer affect a decision.
+DEFAULT_WINDOW_SECONDS = 60
+
+# (window_start, current_count, previous_count)
+WindowCounts = Tuple[float, int, int]
+
+def advance_window(window: float, window_start: float, current: int, previous: int,
+                   now: float) -> WindowCounts:
+    """Roll a key's fixed windows forward to the one containing now"""
+    new_start = now - (now % window)
+    if new_start == window_start:
+        return window_start, current, previous
+    # The old current window is the new previous one only if they are adjacent
+    return new_start, 0, (current if new_start - window_start == window else 0)
+
+class MemoryRateLimitStore:
+    """Counters in this process only: each worker enforces its own limits.
+
+    Keys are kept in least-recently-seen order, so idle keys are evicted from
+    the front, and at most `max_keys` are kept.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> [window_seconds, window_start, current_count, previous_count, last_seen]
+        self._windows: 'OrderedDict[str, list]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def touch(self, key: str, window: Optional[float], now: float, increment: int = 0) -> WindowCounts:
+        """Advance key's windows to now, add `increment` attempts, and return its counts.
+
+        A window of None keeps the key's current window (DEFAULT_WINDOW_SECONDS if new).
+        """
+        with self._lock:
+            state = self._windows.get(key)
+            window = window or (state[0] if state else DEFAULT_WINDOW_SECONDS)
+            if state is None or state[0] != window:
+                state = [window, now - (now % window), 0, 0, now]
+                self._windows[key] = state
+            else:
+                state[1], state[2], state[3] = advance_window(window, state[1], state[2], state[3], now)
+            state[2] += increment
+            state[4] = now
+            self._windows.move_to_end(key)
+            self._evict_idle(now)
+            return state[1], state[2], state[3]
+
+    def _evict_idle(self, now: float) -> None:
+        # The front is least recently seen; stop at the first key that still matters
+        while self._windows:
+            key, state = next(iter(self._windows.items()))
+            if len(self._windows) <= self.max_keys and now - state[4] < 2 * state[0]:
+                break
+            del self._windows[key]
+            self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'keys': len(self._windows),
+                'max_keys': self.max_keys,
+                'evictions': self._evictions
+            }
+
+MAGIC = b'SSRL'
+HEADER = struct.Struct('<4s4xQQ')  # magic, padding, slot count, evictions
+SLOT = struct.Struct('<QddIII4x')  # key hash, window_start, last_seen, window seconds, current, previous
+PROBE_LIMIT = 16
+
+class MmapRateLimitStore:
+    """Counters in a fixed-size hash table in a memory-mapped file, shared by every
+    worker process on the host (and kept across restarts).
+
+    A key hashes to a run of PROBE_LIMIT slots. A lookup reads the whole run
+    under an exclusive file lock; a new key takes an idle slot in its run, or
+    else the least recently seen one, so memory stays at the table size no
+    matter how many keys are seen.
+    """
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        self._lock = threading.Lock()
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._flock(fd, True)
+            try:
+                if os.fstat(fd).st_size < HEADER.size:
+                    os.ftruncate(fd, HEADER.size + SLOT.size * slots)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, HEADER.pack(MAGIC, slots, 0))
+                os.lseek(fd, 0, os.SEEK_SET)
+                magic, self.slots, _ = HEADER.unpack(os.read(fd, HEADER.size))
+            finally:
+                self._flock(fd, False)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a rate limit table")
+            # An existing table keeps the size it was created with
+            self._map = mmap.mmap(fd, HEADER.size + SLOT.size * self.slots)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    @staticmethod
+    def _flock(fd: int, exclusive: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Zero marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+    def _offset(self, index: int) -> int:
+        return HEADER.size + SLOT.size * index
+
+    def touch(self, key: str, window: Optional[float], now: float, increment: int = 0) -> WindowCounts:
+        """Advance key's windows to now, add `increment` attempts, and return its counts.
+
+        A window of None keeps the key's current window (DEFAULT_WINDOW_SECONDS if new).
+        """
+        key_hash = self._hash(key)
+        base = key_hash % self.slots
+        with self._lock:
+            self._flock(self._fd, True)
+            try:
+                found = None
+                free = None
+                oldest = None
+                oldest_seen = None
+                for i in range(PROBE_LIMIT):
+                    index = (base + i) % self.slots
+                    slot = SLOT.unpack_from(self._map, self._offset(index))
+                    if slot[0] == key_hash:
+                        found = index, slot
+                        break
+                    if free is None and (slot[0] == 0 or now - slot[2] >= 2 * slot[3]):
+                        free = index
+                    if oldest_seen is None or slot[2] < oldest_seen:
+                        oldest, oldest_seen = index, slot[2]
+
+                if found is not None:
+                    index, (_, window_start, _, slot_window, current, previous) = found
+                    window = window or slot_window
+                    if slot_window != window:
+                        window_start, current, previous = now - (now % window), 0, 0
+                    else:
+                        window_start, current, previous = advance_window(
+                            window, window_start, current, previous, now)
+                else:
+                    window = window or DEFAULT_WINDOW_SECONDS
+                    if free is not None:
+                        index = free
+                    else:
+                        index = oldest
+                        magic, slots, evictions = HEADER.unpack_from(self._map, 0)
+                        HEADER.pack_into(self._map, 0, magic, slots, evictions + 1)
+                    window_start, current, previous = now - (now % window), 0, 0
+
+                current += increment
+                SLOT.pack_into(self._map, self._offset(index),
+                               key_hash, window_start, now, int(window), current, previous)
+                return window_start, current, previous
+            finally:
+                self._flock(self._fd, False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'mmap',
+            'path': self.path,
+            'slots': self.slots,
+            'evictions': HEADER.unpack_from(self._map, 0)[2]
+        }
+
+def create_rate_limit_store():
+    """Backend chosen by RATE_LIMIT_BACKEND: 'mmap' (default, shared by all workers) or 'memory'"""
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'mmap')
+    if backend == 'memory':
+        return MemoryRateLimitStore(int(os.getenv('RATE_LIMIT_MAX_KEYS', 100000)))
+    if backend == 'mmap':
+        return MmapRateLimitStore(
+            os.getenv('RATE_LIMIT_FILE', os.path.join(tempfile.gettempdir(), 'skillswap_rate_limits.bin')),
+            int(os.getenv('RATE_LIMIT_SLOTS', 65536))
+        )
+    raise ValueError(f"RATE_LIMIT_BACKEND must be 'mmap' or 'memory', not {backend!r}")
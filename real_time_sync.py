@@ -1,23 +1,364 @@
 # Real-time Sync
-# Handles real-time updates using WebSockets or polling
+# WebSocket hub pushing chat messages to conversation rooms and notifications to their users
 
 import asyncio
+import json
+import os
+from collections import deque
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from typing import Any, Dict, List, Optional, Set
+
 import websockets
+from dotenv import load_dotenv
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+
+from db_pool import DB_CONFIG, get_pool
+from notification_hub import EventRing, _format_notification
+from realtime_events import CHAT_MESSAGE, EVENT_TYPES, NOTIFICATION, REQUEST_STATUS, event_ring
+
+load_dotenv()
+
+# Flask workers publish typed events (realtime_events.py) to a ring shared by every
+# process on the host; this server tails it. Chat messages go to the sockets subscribed
+# to the conversation's room (rooms are keyed by skill_swap_requests.id); notifications
+# and request status changes go to the sockets of the users concerned.
+
+HOST = os.getenv('CHAT_WS_HOST', 'localhost')
+PORT = int(os.getenv('CHAT_WS_PORT', 6789))
+POLL_INTERVAL_SECONDS = float(os.getenv('CHAT_POLL_INTERVAL_SECONDS', 0.2))
 
-connected_clients = set()
+# Per-connection outbound queue: frames held for a slow client, and what to do when it is full
+# ('drop_oldest' drops the oldest frame and asks the client to resync; 'disconnect' closes it)
+QUEUE_SIZE = int(os.getenv('CHAT_QUEUE_SIZE', 100))
+QUEUE_POLICY = os.getenv('CHAT_QUEUE_POLICY', 'drop_oldest')
+if QUEUE_POLICY not in ('drop_oldest', 'disconnect'):
+    raise ValueError(f"CHAT_QUEUE_POLICY must be 'drop_oldest' or 'disconnect', not {QUEUE_POLICY!r}")
 
-async def handler(websocket, path):
-    connected_clients.add(websocket)
+# Same key as app.py, so the browser's Flask session cookie identifies the socket's user
+_session_app = Flask(__name__)
+_session_app.secret_key = os.getenv('SECRET_KEY', 'your_secret_key_change_in_production')
+
+def session_user_id(cookie_header: Optional[str]) -> Optional[int]:
+    """User id from a Flask session cookie, or None if missing, forged or expired"""
+    if not cookie_header:
+        return None
+    cookie = SimpleCookie()
+    cookie.load(cookie_header)
+    morsel = cookie.get(_session_app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return None
+    serializer = SecureCookieSessionInterface().get_signing_serializer(_session_app)
     try:
-        async for message in websocket:
-            # Broadcast message to all connected clients
-            for client in connected_clients:
-                if client != websocket:
-                    await client.send(message)
-    except:
-        connected_clients.remove(websocket)
-
-start_server = websockets.serve(handler, 'localhost', 6789)
-
-asyncio.get_event_loop().run_until_complete(start_server)
-asyncio.get_event_loop().run_forever()
+        data = serializer.loads(morsel.value,
+                                max_age=int(_session_app.permanent_session_lifetime.total_seconds()))
+    except Exception:
+        return None
+    return data.get('user_id')
+
+def _is_member(user_id: int, request_id: int) -> bool:
+    with get_pool(DB_CONFIG).connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT 1 FROM skill_swap_requests
+            WHERE id = %s AND status = 'accepted' AND %s IN (requester_id, requestee_id)
+        """, (request_id, user_id))
+        member = cursor.fetchone() is not None
+        cursor.close()
+    return member
+
+def _load_rows(message_ids: List[int], notification_ids: List[int], request_ids: List[int]) -> Dict[str, List[tuple]]:
+    """Rows named by one batch of events, over a single pooled connection"""
+    queries = {
+        'messages': ("""
+            SELECT id, request_id, sender_id, message, sent_at
+            FROM chat_messages WHERE id IN ({})
+            ORDER BY sent_at, id
+        """, message_ids),
+        'notifications': ("""
+            SELECT user_id, id, type, title, message, is_read, related_request_id, created_at
+            FROM notifications WHERE id IN ({})
+            ORDER BY id
+        """, notification_ids),
+        'requests': ("""
+            SELECT id, requester_id, requestee_id, status
+            FROM skill_swap_requests WHERE id IN ({})
+        """, request_ids)
+    }
+    rows = {name: [] for name in queries}
+    with get_pool(DB_CONFIG).connection() as conn:
+        cursor = conn.cursor()
+        for name, (query, ids) in queries.items():
+            if ids:
+                cursor.execute(query.format(', '.join(['%s'] * len(ids))), ids)
+                rows[name] = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def _encode(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(',', ':'))
+
+RESYNC = _encode({'type': 'resync'})
+
+class ChatConnection:
+    """One socket: its rooms plus a bounded outbound queue drained by its own writer task.
+
+    Fan-out only appends to the queue, so a slow client never holds up the
+    others; when its queue is full the configured policy either drops the
+    oldest frame (and tells the client to resync) or disconnects it.
+    """
+
+    def __init__(self, websocket, user_id: int, queue_size: int = QUEUE_SIZE, policy: str = QUEUE_POLICY):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.rooms: Set[int] = set()
+        self.policy = policy
+        self.sent = 0
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque = deque()
+        self._queue_size = queue_size
+        self._needs_resync = False
+        self._ready = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, data: str) -> bool:
+        """Queue a frame without waiting; returns False if the connection was dropped for being slow"""
+        if self.closed:
+            return False
+        if len(self._queue) >= self._queue_size:
+            if self.policy == 'disconnect':
+                self.close(1013, 'Too far behind; reconnect and refetch')
+                return False
+            self._queue.popleft()
+            self.dropped += 1
+            self._needs_resync = True
+        self._queue.append(data)
+        self._ready.set()
+        return True
+
+    async def _write(self) -> None:
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue or self._needs_resync:
+                    if self._needs_resync:
+                        # Frames were dropped: have the client reload before applying the rest
+                        self._needs_resync = False
+                        await self.websocket.send(RESYNC)
+                        continue
+                    await self.websocket.send(self._queue.popleft())
+                    self.sent += 1
+        except websockets.ConnectionClosed:
+            self.closed = True
+
+    def close(self, code: Optional[int] = None, reason: str = '') -> None:
+        """Stop writing; with a code, also close the socket (otherwise it is already closing)"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        if code is not None:
+            asyncio.ensure_future(self.websocket.close(code=code, reason=reason))
+
+class ChatRooms:
+    """Room registry for one server process.
+
+    Each socket belongs to the rooms it subscribed to (after a membership
+    check), and a message is queued only for the connections in its room, so
+    the cost of a message depends on its conversation, not on how many
+    clients are connected.
+    """
+
+    def __init__(self, ring: EventRing):
+        self.ring = ring
+        self._seq = ring.head()
+        self._rooms: Dict[int, Set[ChatConnection]] = {}
+        self._users: Dict[int, Set[ChatConnection]] = {}
+        self._connections: Set[ChatConnection] = set()
+        self._events = {event_type: 0 for event_type in EVENT_TYPES.values()}
+
+        # Totals from connections that are already gone, for stats()
+        self._closed_sent = 0
+        self._closed_dropped = 0
+        self._slow_disconnects = 0
+
+    def join(self, connection: ChatConnection, request_id: int) -> None:
+        self._rooms.setdefault(request_id, set()).add(connection)
+        connection.rooms.add(request_id)
+
+    def leave(self, connection: ChatConnection, request_id: int) -> None:
+        members = self._rooms.get(request_id)
+        if members:
+            members.discard(connection)
+            if not members:
+                del self._rooms[request_id]
+        connection.rooms.discard(request_id)
+
+    def drop(self, connection: ChatConnection) -> None:
+        for request_id in list(connection.rooms):
+            self.leave(connection, request_id)
+        if connection in self._connections:
+            self._connections.discard(connection)
+            connections = self._users.get(connection.user_id)
+            if connections:
+                connections.discard(connection)
+                if not connections:
+                    del self._users[connection.user_id]
+            self._closed_sent += connection.sent
+            self._closed_dropped += connection.dropped
+        connection.close()
+
+    def _enqueue(self, connection: ChatConnection, data: str) -> None:
+        if connection.closed:
+            return  # its handler unregisters it
+        if not connection.enqueue(data):
+            self._slow_disconnects += 1
+            self.drop(connection)
+
+    async def handler(self, websocket) -> None:
+        user_id = session_user_id(websocket.request_headers.get('Cookie'))
+        if user_id is None:
+            await websocket.close(code=1008, reason='Please log in to access chat')
+            return
+        connection = ChatConnection(websocket, user_id)
+        self._connections.add(connection)
+        self._users.setdefault(user_id, set()).add(connection)
+        try:
+            async for raw in websocket:
+                if connection.closed:
+                    break
+                await self._handle_command(connection, raw)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.drop(connection)
+
+    async def _handle_command(self, connection: ChatConnection, raw) -> None:
+        try:
+            command = json.loads(raw)
+            action = command['type']
+            request_id = int(command['request_id'])
+        except (ValueError, TypeError, KeyError):
+            self._enqueue(connection, _encode({'type': 'error', 'error': 'Expected {"type", "request_id"}'}))
+            return
+
+        if action == 'subscribe':
+            if not await asyncio.to_thread(_is_member, connection.user_id, request_id):
+                self._enqueue(connection, _encode({'type': 'error', 'request_id': request_id,
+                                                   'error': 'Unauthorized access to chat'}))
+                return
+            if not connection.closed:
+                self.join(connection, request_id)
+                self._enqueue(connection, _encode({'type': 'subscribed', 'request_id': request_id}))
+        elif action == 'unsubscribe':
+            self.leave(connection, request_id)
+            self._enqueue(connection, _encode({'type': 'unsubscribed', 'request_id': request_id}))
+        else:
+            self._enqueue(connection, _encode({'type': 'error', 'error': f'Unknown command: {action}'}))
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            try:
+                await self._poll()
+            except Exception as e:  # keep watching; clients catch up through GET /chat/<id>?after_id=
+                print(f"Realtime event poll failed: {e}")
+
+    async def _poll(self) -> None:
+        events, self._seq, overflowed = self.ring.read_since(self._seq)
+        if overflowed:
+            # Missed events: every client refetches what it is missing
+            for connection in list(self._connections):
+                self._enqueue(connection, RESYNC)
+        for kind, _, _ in events:
+            if kind in EVENT_TYPES:
+                self._events[EVENT_TYPES[kind]] += 1
+
+        # Only rows someone connected here will receive are loaded
+        message_ids = [message_id for kind, request_id, message_id in events
+                       if kind == CHAT_MESSAGE and request_id in self._rooms]
+        notification_ids = [notification_id for kind, user_id, notification_id in events
+                             if kind == NOTIFICATION and user_id in self._users]
+        request_ids = list({request_id for kind, request_id, _ in events if kind == REQUEST_STATUS})
+        if not (message_ids or notification_ids or request_ids):
+            return
+        rows = await asyncio.to_thread(_load_rows, message_ids, notification_ids, request_ids)
+
+        for request_id, requester_id, requestee_id, status in rows['requests']:
+            if status != 'accepted':
+                # The conversation is closed: nobody stays subscribed to it
+                for connection in list(self._rooms.get(request_id, ())):
+                    self.leave(connection, request_id)
+                    self._enqueue(connection, _encode({'type': 'unsubscribed', 'request_id': request_id}))
+            data = _encode({'type': 'request_status', 'request_id': request_id, 'status': status,
+                            'requester_id': requester_id, 'requestee_id': requestee_id})
+            for user_id in {requester_id, requestee_id}:
+                for connection in list(self._users.get(user_id, ())):
+                    self._enqueue(connection, data)
+
+        for row in rows['notifications']:
+            data = _encode({'type': 'notification', 'notification': _format_notification(row[1:])})
+            for connection in list(self._users.get(row[0], ())):
+                self._enqueue(connection, data)
+
+        for message_id, request_id, sender_id, message, sent_at in rows['messages']:
+            members = list(self._rooms.get(request_id, ()))
+            if not members:
+                continue
+            payload = {
+                'id': message_id,
+                'message': message,
+                'sent_at': sent_at.isoformat() if sent_at else None,
+                'sender_id': sender_id
+            }
+            # Two encodings per room at most: the sender's own view and everyone else's
+            views = {
+                is_own: _encode({'type': 'message', 'request_id': request_id,
+                                 'message': {**payload, 'is_from_current_user': is_own}})
+                for is_own in {connection.user_id == sender_id for connection in members}
+            }
+            for connection in members:
+                self._enqueue(connection, views[connection.user_id == sender_id])
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [connection.depth for connection in self._connections]
+        return {
+            'connections': len(self._connections),
+            'users': len(self._users),
+            'rooms': len(self._rooms),
+            'events': dict(self._events),
+            'queue_policy': QUEUE_POLICY,
+            'queue_size': QUEUE_SIZE,
+            'queued': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'sent': self._closed_sent + sum(connection.sent for connection in self._connections),
+            'dropped': self._closed_dropped + sum(connection.dropped for connection in self._connections),
+            'slow_disconnects': self._slow_disconnects,
+            'ring_head': self.ring.head(),
+            'ring_seen': self._seq
+        }
+
+    def process_request(self, path: str, request_headers):
+        """Serve GET /stats as plain HTTP on the WebSocket port; everything else is a handshake"""
+        if path == '/stats':
+            body = json.dumps(self.stats()).encode()
+            return HTTPStatus.OK, [('Content-Type', 'application/json')], body
+        return None
+
+# Global chat rooms instance
+chat_rooms = ChatRooms(event_ring)
+
+async def main() -> None:
+    async with websockets.serve(chat_rooms.handler, HOST, PORT, process_request=chat_rooms.process_request):
+        await chat_rooms.watch()
+
+if __name__ == '__main__':
+    asyncio.run(main())
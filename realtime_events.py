@@ -0,0 +1,39 @@
+# Realtime Events
+# Typed events published by the Flask workers and fanned out by the WebSocket hub (real_time_sync.py)
+
+import os
+import tempfile
+from typing import Dict
+
+from notification_hub import EventRing
+
+# Every worker process on the host appends to the same memory-mapped ring (no
+# broker or network service involved); the hub tails it. Publishers never block
+# on the hub, and a hub that restarts or falls behind resynchronizes its clients.
+# Each event carries two ids; the hub loads the rows they name.
+
+# Event kinds
+CHAT_MESSAGE = 1  # (request_id, message_id): a chat message was sent
+NOTIFICATION = 2  # (user_id, notification_id): a notification was created
+REQUEST_STATUS = 3  # (request_id, 0): a skill swap request was created or changed status
+
+EVENT_TYPES: Dict[int, str] = {
+    CHAT_MESSAGE: 'chat_message',
+    NOTIFICATION: 'notification',
+    REQUEST_STATUS: 'request_status'
+}
+
+event_ring = EventRing(
+    os.getenv('REALTIME_RING_FILE', os.path.join(tempfile.gettempdir(), 'skillswap_realtime_ring.bin'))
+)
+
+# Publishing (call after the writing transaction commits)
+
+def publish_chat_message(request_id: int, message_id: int) -> None:
+    event_ring.append(CHAT_MESSAGE, request_id, message_id)
+
+def publish_notification(user_id: int, notification_id: int) -> None:
+    event_ring.append(NOTIFICATION, user_id, notification_id)
+
+def publish_request_status(request_id: int) -> None:
+    event_ring.append(REQUEST_STATUS, request_id)
@@ -0,0 +1,124 @@
+# Request Cache
+# In-process TTL/LRU of skill swap request parties and status, for chat authorization
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from realtime_events import REQUEST_STATUS, event_ring
+
+# (requester_id, requestee_id, status), or None for a request that does not exist
+Parties = Optional[Tuple[int, int, str]]
+
+class SwapRequestCache:
+    """Thread-safe LRU of request_id -> (requester_id, requestee_id, status).
+
+    Invalidation is per request: every request write publishes its id on the
+    realtime event ring (realtime_events.publish_request_status), and each
+    worker drains the ring before a lookup and evicts just those ids. Nothing
+    else goes stale, and a quiet ring costs one 8-byte read. Only existing
+    requests are cached, so creating one invalidates nothing. The TTL bounds
+    how long a change made outside the app (no event) can go unnoticed.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, ring=event_ring):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._ring = ring
+        self._ring_seq = ring.head()
+        self._entries: 'OrderedDict[int, Tuple[float, Tuple[int, int, str]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._ring_overflows = 0
+
+    def _drain_events(self) -> None:
+        """Evict requests changed (by any worker) since the last drain; call with the lock held"""
+        events, self._ring_seq, overflowed = self._ring.read_since(self._ring_seq)
+        if overflowed:
+            # Fell too far behind to know which requests changed
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._ring_overflows += 1
+            return
+        for kind, request_id, _ in events:
+            if kind == REQUEST_STATUS and self._entries.pop(request_id, None) is not None:
+                self._invalidations += 1
+
+    def get(self, request_id: int) -> Parties:
+        """Cached parties of an existing request that has not expired, else None"""
+        with self._lock:
+            self._drain_events()
+            entry = self._entries.get(request_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._misses += 1
+                return None
+            self._entries.move_to_end(request_id)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, request_id: int, parties: Tuple[int, int, str]) -> None:
+        with self._lock:
+            self._entries.pop(request_id, None)
+            self._entries[request_id] = (time.monotonic() + self.ttl_seconds, parties)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def evict(self, request_id: int) -> None:
+        """Drop a request whose status just changed in this worker (others see its event)"""
+        with self._lock:
+            if self._entries.pop(request_id, None) is not None:
+                self._invalidations += 1
+
+    def lookup(self, conn, request_id: int) -> Parties:
+        """Parties and status of a request, querying only on a miss"""
+        # get() drains the ring first, so a write racing the query below is
+        # evicted again by the next lookup
+        parties = self.get(request_id)
+        if parties is not None:
+            return parties
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT requester_id, requestee_id, status
+            FROM skill_swap_requests WHERE id = %s
+        """, (request_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        if row is None:
+            # Not cached: the id may be created at any moment
+            return None
+        parties = tuple(row)
+        self.put(request_id, parties)
+        return parties
+
+    def is_chat_member(self, conn, request_id: int, user_id: int) -> bool:
+        """Whether user_id is a party to request_id and the request is accepted"""
+        parties = self.lookup(conn, request_id)
+        return parties is not None and parties[2] == 'accepted' and user_id in parties[:2]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+                'ring_overflows': self._ring_overflows
+            }
+
+# Global swap request cache instance
+swap_request_cache = SwapRequestCache(
+    int(os.getenv('REQUEST_CACHE_MAX_ENTRIES', 10000)),
+    float(os.getenv('REQUEST_CACHE_TTL_SECONDS', 60))
+)
@@ -75,6 +75,8 @@ DB_HOST={db_host}
 DB_USER={db_user}
 DB_PASSWORD={db_password}
 DB_NAME={db_name}
+DB_POOL_SIZE=10
+DB_POOL_TIMEOUT=5
 
 # Email Configuration
 SMTP_SERVER={smtp_server}
@@ -0,0 +1,141 @@
+# Skill Autocomplete
+# Sorted-array prefix index over skills.name, ranked by how many users offer or want each skill
+
+import bisect
+import heapq
+import threading
+from typing import Any, Dict, List, Tuple
+
+from table_versions import table_versions
+
+# Incremental refreshes re-read this many ids below each watermark
+REFRESH_OVERLAP_ROWS = 200
+
+# Results for prefixes up to this length are memoized until the next change
+MEMO_PREFIX_LENGTH = 2
+
+class SkillAutocomplete:
+    """Prefix completion over the skills catalog.
+
+    Every word start of a skill name ("machine learning", "learning") is a key
+    in one sorted list, so a prefix is a bisect range; the top-N within the
+    range is taken by user count (offered + wanted). Short prefixes, whose
+    ranges are widest, are memoized until the catalog or the counts change.
+
+    New skills and new user_skills rows are applied incrementally through
+    their auto-increment ids; a catalog size that no longer adds up (a
+    rejected skill, possibly cascading to user rows) triggers a full reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._keys: List[Tuple[str, int]] = []
+        self._skills: Dict[int, Tuple[str, str]] = {}
+        self._user_counts: Dict[int, int] = {}
+        self._memo: Dict[Tuple[str, int], List[int]] = {}
+        self._skills_watermark = 0
+        self._row_watermarks = {'user_skills_offered': 0, 'user_skills_wanted': 0}
+        self._recent_rows = {'user_skills_offered': set(), 'user_skills_wanted': set()}
+        self._skills_version = None
+        self._profiles_version = None
+
+    def _add_skill(self, skill_id: int, name: str, category: str, keep_sorted: bool = True) -> None:
+        if skill_id in self._skills:
+            return
+        self._skills[skill_id] = (name, category)
+        self._user_counts.setdefault(skill_id, 0)
+        words = name.lower().split()
+        for i in range(len(words)):
+            key = (' '.join(words[i:]), skill_id)
+            if keep_sorted:
+                bisect.insort(self._keys, key)
+            else:
+                self._keys.append(key)
+        self._skills_watermark = max(self._skills_watermark, skill_id)
+        self._memo.clear()
+
+    def add_skill(self, skill_id: int, name: str, category: str) -> None:
+        """Record a newly committed catalog entry"""
+        with self._lock:
+            if self._loaded:
+                self._add_skill(skill_id, name, category)
+
+    def _load(self, cursor) -> None:
+        self._reset()
+        cursor.execute("SELECT id, name, category FROM skills")
+        for skill_id, name, category in cursor.fetchall():
+            self._add_skill(skill_id, name, category, keep_sorted=False)
+        self._keys.sort()
+        self._load_counts(cursor)
+
+    def _load_counts(self, cursor) -> None:
+        for table in self._row_watermarks:
+            watermark = self._row_watermarks[table]
+            recent = self._recent_rows[table]
+            low = max(watermark - REFRESH_OVERLAP_ROWS, 0)
+            cursor.execute(f"SELECT id, skill_id FROM {table} WHERE id > %s", (low,))
+            for row_id, skill_id in cursor.fetchall():
+                # Rows in the overlap window were already counted by an earlier pass
+                if row_id in recent:
+                    continue
+                recent.add(row_id)
+                watermark = max(watermark, row_id)
+                if skill_id in self._skills:
+                    self._user_counts[skill_id] += 1
+            self._row_watermarks[table] = watermark
+            cutoff = watermark - REFRESH_OVERLAP_ROWS
+            self._recent_rows[table] = {row_id for row_id in recent if row_id > cutoff}
+        self._memo.clear()
+
+    def sync(self, cursor) -> None:
+        """Bring the index up to date; free when no skill or profile write happened since the last sync"""
+        skills_version = table_versions.get('skills')
+        profiles_version = table_versions.get('profiles')
+        with self._lock:
+            if not self._loaded:
+                self._load(cursor)
+                self._loaded = True
+            elif skills_version != self._skills_version:
+                cursor.execute("SELECT id, name, category FROM skills WHERE id > %s", (self._skills_watermark,))
+                for skill_id, name, category in cursor.fetchall():
+                    self._add_skill(skill_id, name, category)
+                cursor.execute("SELECT COUNT(*) FROM skills")
+                if cursor.fetchone()[0] != len(self._skills):
+                    # A skill was deleted (or raced in): start over rather than diffing
+                    self._load(cursor)
+                else:
+                    self._load_counts(cursor)
+            elif profiles_version != self._profiles_version:
+                self._load_counts(cursor)
+            self._skills_version = skills_version
+            self._profiles_version = profiles_version
+
+    def complete(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Top `limit` skills with a name or word starting with prefix, most used first"""
+        prefix = ' '.join(prefix.lower().split())
+        with self._lock:
+            memo_key = (prefix, limit)
+            skill_ids = self._memo.get(memo_key)
+            if skill_ids is None:
+                lo = bisect.bisect_left(self._keys, (prefix,))
+                hi = bisect.bisect_left(self._keys, (prefix + '\uffff',)) if prefix else len(self._keys)
+                candidates = {skill_id for _, skill_id in self._keys[lo:hi]}
+                skill_ids = heapq.nlargest(
+                    limit, candidates,
+                    key=lambda skill_id: (self._user_counts[skill_id], -skill_id)
+                )
+                if len(prefix) <= MEMO_PREFIX_LENGTH:
+                    self._memo[memo_key] = skill_ids
+            return [{
+                'id': skill_id,
+                'name': self._skills[skill_id][0],
+                'category': self._skills[skill_id][1],
+                'users': self._user_counts[skill_id]
+            } for skill_id in skill_ids]
+
+# Global skill autocomplete instance
+skill_autocomplete = SkillAutocomplete()
@@ -0,0 +1,174 @@
+# Skill Matching
+# In-memory reciprocal matching index over user_skills_offered / user_skills_wanted
+
+import heapq
+import threading
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from table_versions import table_versions
+from availability import shared_slot_count
+
+LEVEL_RANK = {'beginner': 1, 'intermediate': 2, 'advanced': 3, 'expert': 4}
+
+# Incremental refreshes re-read this many ids below the watermark, so rows whose
+# transaction committed after a higher id was already seen are not skipped
+REFRESH_OVERLAP_ROWS = 200
+
+class SkillMatchIndex:
+    """Posting lists of user ids per skill, for "offers what I want and wants what I offer".
+
+    Postings are compact unsigned int arrays; a query unions the postings of the
+    caller's wanted skills (counting overlap), unions the postings of the
+    caller's offered skills, and intersects the two. Inserts made by any worker
+    are picked up incrementally through the tables' auto-increment ids; a skill
+    deletion (which can cascade-delete rows) triggers a full reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._offered_postings: Dict[int, array] = {}
+        self._wanted_postings: Dict[int, array] = {}
+        self._user_offered: Dict[int, Dict[int, int]] = {}
+        self._user_wanted: Dict[int, Dict[int, int]] = {}
+        self._private_users = set()
+        self._offered_watermark = 0
+        self._wanted_watermark = 0
+        self._skill_count = 0
+        self._skill_max_id = 0
+        self._skills_version = None
+        self._profiles_version = None
+
+    def _add(self, postings, user_skills, user_id: int, skill_id: int, level: str) -> None:
+        skills = user_skills.setdefault(user_id, {})
+        if skill_id not in skills:
+            postings.setdefault(skill_id, array('I')).append(user_id)
+        skills[skill_id] = LEVEL_RANK.get(level, 1)
+
+    def add_offered(self, user_id: int, skill_id: int, level: str) -> None:
+        """Record an offered skill right after the writing transaction commits"""
+        with self._lock:
+            if self._loaded:
+                self._add(self._offered_postings, self._user_offered, user_id, skill_id, level)
+
+    def add_wanted(self, user_id: int, skill_id: int, level: str) -> None:
+        """Record a wanted skill right after the writing transaction commits"""
+        with self._lock:
+            if self._loaded:
+                self._add(self._wanted_postings, self._user_wanted, user_id, skill_id, level)
+
+    def _apply_rows(self, cursor, table: str, level_column: str, watermark: int,
+                    postings, user_skills) -> int:
+        cursor.execute(f"""
+            SELECT t.id, t.user_id, t.skill_id, t.{level_column}, u.is_public
+            FROM {table} t
+            JOIN users u ON t.user_id = u.id
+            WHERE t.id > %s
+            ORDER BY t.id
+        """, (max(watermark - REFRESH_OVERLAP_ROWS, 0),))
+        for row_id, user_id, skill_id, level, is_public in cursor.fetchall():
+            self._add(postings, user_skills, user_id, skill_id, level)
+            if not is_public:
+                self._private_users.add(user_id)
+            watermark = max(watermark, row_id)
+        return watermark
+
+    def _refresh(self, cursor) -> None:
+        self._offered_watermark = self._apply_rows(
+            cursor, 'user_skills_offered', 'proficiency_level', self._offered_watermark,
+            self._offered_postings, self._user_offered
+        )
+        self._wanted_watermark = self._apply_rows(
+            cursor, 'user_skills_wanted', 'desired_level', self._wanted_watermark,
+            self._wanted_postings, self._user_wanted
+        )
+
+    def _skill_deleted(self, cursor) -> bool:
+        """Whether a skill known at the last sync is gone; new catalog entries alone change no postings"""
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(id <= %s), 0), COALESCE(MAX(id), 0) FROM skills",
+                       (self._skill_max_id,))
+        count, known, max_id = cursor.fetchone()
+        deleted = int(known) < self._skill_count
+        self._skill_count, self._skill_max_id = count, max_id
+        return deleted
+
+    def sync(self, cursor) -> None:
+        """Bring the index up to date; free when no profile or skill write happened since the last sync"""
+        skills_version = table_versions.get('skills')
+        profiles_version = table_versions.get('profiles')
+        with self._lock:
+            if not self._loaded:
+                self._skill_deleted(cursor)
+                self._refresh(cursor)
+                self._loaded = True
+            elif skills_version != self._skills_version and self._skill_deleted(cursor):
+                # The delete may have cascaded to any number of rows: start over rather than diffing
+                self._reset()
+                self._skill_deleted(cursor)
+                self._refresh(cursor)
+            elif skills_version != self._skills_version or profiles_version != self._profiles_version:
+                self._refresh(cursor)
+            self._skills_version = skills_version
+            self._profiles_version = profiles_version
+
+    def top_matches(self, user_id: int, k: int, my_mask: int = 0,
+                    mask_for: Optional[Callable[[int], int]] = None,
+                    among: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+        """Top-k public users who offer what user_id wants and want what user_id offers.
+
+        With mask_for, shared availability slots break ties after overlap and
+        gap; `among` restricts candidates (e.g. to users free whenever I am).
+        """
+        with self._lock:
+            my_wanted = self._user_wanted.get(user_id, {})
+            my_offered = self._user_offered.get(user_id, {})
+            if not my_wanted or not my_offered:
+                return []
+
+            # Users who offer something I want
+            teachers = set()
+            for skill_id in my_wanted:
+                teachers.update(self._offered_postings.get(skill_id, ()))
+
+            # Users who want something I offer
+            learners = set()
+            for skill_id in my_offered:
+                learners.update(self._wanted_postings.get(skill_id, ()))
+
+            candidates = (teachers & learners) - self._private_users
+            candidates.discard(user_id)
+            if among is not None:
+                candidates &= among
+
+            scored = []
+            for candidate in candidates:
+                their_offered = self._user_offered[candidate]
+                their_wanted = self._user_wanted[candidate]
+
+                teaches = [s for s in my_wanted if s in their_offered]
+                learns = [s for s in my_offered if s in their_wanted]
+
+                # Positive gap: the teacher is at or above the level the learner wants
+                gap = sum(their_offered[s] - my_wanted[s] for s in teaches)
+                gap += sum(my_offered[s] - their_wanted[s] for s in learns)
+
+                shared = shared_slot_count(my_mask, mask_for(candidate)) if mask_for else 0
+
+                scored.append((len(teaches) + len(learns), gap, shared, -candidate, teaches, learns))
+
+            best = heapq.nlargest(k, scored, key=lambda item: item[:4])
+            return [{
+                'user_id': -neg_id,
+                'overlap': overlap,
+                'proficiency_gap': gap,
+                'shared_slots': shared,
+                'teaches_skill_ids': teaches,
+                'learns_skill_ids': learns
+            } for overlap, gap, shared, neg_id, teaches, learns in best]
+
+# Global matching index instance
+skill_match_index = SkillMatchIndex()
@@ -0,0 +1,96 @@
+# Table Versions
+# Per-table change counters shared by every worker process on the host, used for ETags
+
+import hashlib
+import mmap
+import os
+import secrets
+import struct
+import tempfile
+import threading
+from typing import Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: counters are still correct within a single process
+    fcntl = None
+
+MAGIC = b'SSTV'
+HEADER = struct.Struct('<4s4xQ')  # magic, padding, generation
+SLOT = struct.Struct('<Q')
+MAX_SLOTS = 64
+
+# Append-only: a table's slot index must never change once released
+TABLE_SLOTS: Dict[str, int] = {
+    'skills': 0,
+    'profiles': 1,
+    'users': 2,  # renames and other in-place edits of user rows
+    # 3: retired ('swap_requests'); request_cache now evicts per request from the event ring
+}
+
+class TableVersions:
+    """Monotonic per-table counters in a small memory-mapped file.
+
+    Readers never touch MySQL: a version read is a single 8-byte mmap lookup.
+    Writers bump the counter after their transaction commits. The file carries
+    a random generation id so counters recreated from zero never reuse an ETag.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        size = HEADER.size + SLOT.size * MAX_SLOTS
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._flock(fd, True)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    os.write(fd, HEADER.pack(MAGIC, secrets.randbits(64)))
+            finally:
+                self._flock(fd, False)
+            self._map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+        magic, self.generation = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a table versions file")
+
+    @staticmethod
+    def _flock(fd: int, exclusive: bool) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_UN)
+
+    @staticmethod
+    def _offset(table: str) -> int:
+        return HEADER.size + SLOT.size * TABLE_SLOTS[table]
+
+    def get(self, table: str) -> int:
+        """Current version of a table"""
+        return SLOT.unpack_from(self._map, self._offset(table))[0]
+
+    def bump(self, *tables: str) -> None:
+        """Advance the version of each table; call after the write has committed"""
+        with self._lock:
+            self._flock(self._fd, True)
+            try:
+                for table in tables:
+                    offset = self._offset(table)
+                    SLOT.pack_into(self._map, offset, SLOT.unpack_from(self._map, offset)[0] + 1)
+            finally:
+                self._flock(self._fd, False)
+
+    def etag(self, table: str, *variant) -> str:
+        """Strong ETag for a response derived from `table` and any request-specific inputs"""
+        key = ':'.join(str(part) for part in (self.generation, table, self.get(table)) + variant)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+# Global table versions instance
+table_versions = TableVersions(
+    os.getenv('TABLE_VERSIONS_FILE', os.path.join(tempfile.gettempdir(), 'skillswap_table_versions.bin'))
+)
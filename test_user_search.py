@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory user search index (no database needed)
+"""
+import os
+import tempfile
+
+from table_versions import TableVersions
+from user_search import UserSearchIndex
+
+def make_tables():
+    """Fresh rows for one test"""
+    return {
+        'users': [(1, 'John Smith', 'john.smith@example.com'), (2, 'Alice Jones', 'alice@example.com')],
+        'skills': [(10, 'Machine Learning'), (11, 'Python')],
+        'offered': [(1, 1, 10)],
+        'wanted': [(1, 2, 11)],
+    }
+
+class FakeCursor:
+    """Answers the index's sync queries from a make_tables() dict, recording each query"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(' '.join(query.split()))
+        if 'COUNT(*) FROM skills' in query:
+            self._rows = [(len(self.tables['skills']),)]
+        elif 'FROM skills WHERE id >' in query:
+            self._rows = [skill for skill in self.tables['skills'] if skill[0] > params[0]]
+        elif 'FROM skills' in query:
+            self._rows = self.tables['skills']
+        elif 'FROM users' in query:
+            self._rows = self.tables['users']
+        elif 'user_skills_offered' in query:
+            self._rows = self.tables['offered']
+        else:
+            self._rows = self.tables['wanted']
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def fetchone(self):
+        return self._rows[0]
+
+def make_versions(directory):
+    return TableVersions(os.path.join(str(directory), 'table_versions.bin'))
+
+def make_index(directory, tables):
+    index = UserSearchIndex(make_versions(directory))
+    index.sync(FakeCursor(tables))
+    return index
+
+def names(index, query):
+    users, _ = index.search(query, 10)
+    return [user['name'] for user in users]
+
+def test_prefix_query(tmp_path):
+    assert names(make_index(tmp_path, make_tables()), 'smi') == ['John Smith']
+
+def test_mid_word_substring_queries(tmp_path):
+    index = make_index(tmp_path, make_tables())
+    assert names(index, 'mith') == ['John Smith']
+    assert names(index, 'ohn') == ['John Smith']
+    assert names(index, 'earn') == ['John Smith']
+    assert names(index, 'ytho') == ['Alice Jones']
+
+def test_short_queries_match_prefixes_only(tmp_path):
+    index = make_index(tmp_path, make_tables())
+    assert names(index, 'jo') == ['Alice Jones', 'John Smith']
+    assert names(index, 'oh') == []
+
+def test_prefix_ranks_above_substring(tmp_path):
+    tables = make_tables()
+    tables['users'].append((3, 'Earnest Brown', 'eb@example.com'))
+    assert names(make_index(tmp_path, tables), 'earn') == ['Earnest Brown', 'John Smith']
+
+def test_new_skill_is_added_without_a_reload(tmp_path):
+    tables = make_tables()
+    index = make_index(tmp_path, tables)
+    tables['skills'].append((12, 'Data Engineering'))
+    tables['offered'].append((2, 2, 12))
+
+    make_versions(tmp_path).bump('skills', 'profiles')
+    cursor = FakeCursor(tables)
+    index.sync(cursor)
+
+    assert names(index, 'engin') == ['Alice Jones']
+    assert names(index, 'mith') == ['John Smith']
+    # Only the new catalog entries were read, not the whole catalog
+    assert 'SELECT id, name FROM skills' not in cursor.queries
+
+def test_deleted_skill_reloads(tmp_path):
+    tables = make_tables()
+    index = make_index(tmp_path, tables)
+    del tables['skills'][0]
+    tables['offered'].clear()
+
+    make_versions(tmp_path).bump('skills', 'profiles')
+    index.sync(FakeCursor(tables))
+
+    assert names(index, 'earn') == []
+
+if __name__ == '__main__':
+    for test in (test_prefix_query, test_mid_word_substring_queries,
+                 test_short_queries_match_prefixes_only, test_prefix_ranks_above_substring,
+                 test_new_skill_is_added_without_a_reload, test_deleted_skill_reloads):
+        with tempfile.TemporaryDirectory() as directory:
+            test(directory)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,269 @@
+# User Search
+# In-memory token/trigram inverted index over user names, emails and skill names
+
+import heapq
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from table_versions import table_versions
+
+# Incremental refreshes re-read this many ids below each watermark
+REFRESH_OVERLAP_ROWS = 200
+
+_TOKEN_RE = re.compile(r'[a-z0-9+#.]+')
+
+NAME, SKILL, EMAIL = 0, 1, 2
+
+# Match quality of one query term against one indexed token: (exact, prefix, substring)
+FIELD_SCORES = {
+    NAME: (8, 6, 2),
+    SKILL: (5, 4, 1),
+    EMAIL: (3, 3, 1),
+}
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or '').lower())
+
+def trigrams(token: str) -> Set[str]:
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+def grams(token: str) -> Set[str]:
+    """Index keys of a token: its trigrams plus its one- and two-character prefixes (for short queries)"""
+    return trigrams(token) | {token[:1], token[:2]}
+
+def term_score(token: str, term: str, field: int) -> int:
+    exact, prefix, substring = FIELD_SCORES[field]
+    if token == term:
+        return exact
+    if token.startswith(term):
+        return prefix
+    return substring if term in token else 0
+
+class UserSearchIndex:
+    """Inverted index answering substring-style user search without table scans.
+
+    Two levels: grams point at distinct tokens (the vocabulary, which grows
+    far slower than the user table), and each (field, token) points at the set
+    of users carrying it. A query term resolves to a handful of vocabulary
+    tokens, each of which contributes a whole user set at one match quality, so
+    ranking works on score tiers with set operations instead of visiting every
+    matching user in Python. Only the requested page is sorted.
+
+    Inserts made by any worker are picked up incrementally through the tables'
+    auto-increment ids; renames or skill deletions trigger a full reload.
+    """
+
+    def __init__(self, versions=None):
+        # Table version counters; the shared table_versions unless given one (tests)
+        self._versions = versions or table_versions
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._users: Dict[int, Tuple[str, str]] = {}
+        self._user_skills: Dict[int, List[int]] = {}
+        self._sort_keys: Dict[int, Tuple[str, int]] = {}
+        self._skill_names: Dict[int, str] = {}
+        self._gram_tokens: Dict[str, Set[str]] = {}
+        self._token_users: Dict[Tuple[int, str], Set[int]] = {}
+        self._by_name: Optional[List[Tuple[str, int]]] = None
+        self._users_watermark = 0
+        self._offered_watermark = 0
+        self._wanted_watermark = 0
+        self._skills_version = None
+        self._users_version = None
+        self._profiles_version = None
+
+    def _index_token(self, user_id: int, field: int, token: str) -> None:
+        users = self._token_users.get((field, token))
+        if users is None:
+            users = self._token_users[(field, token)] = set()
+            for key in grams(token):
+                self._gram_tokens.setdefault(key, set()).add(token)
+        users.add(user_id)
+
+    def _add_user(self, user_id: int, name: str, email: str) -> None:
+        if user_id in self._users:
+            return
+        self._users[user_id] = (name, email)
+        self._sort_keys[user_id] = ((name or '').lower(), user_id)
+        for token in tokenize(name):
+            self._index_token(user_id, NAME, token)
+        # Local part only, so "@gmail.com" does not match half the user table
+        for token in tokenize((email or '').split('@')[0]):
+            self._index_token(user_id, EMAIL, token)
+        self._by_name = None
+
+    def _add_user_skill(self, user_id: int, skill_id: int) -> None:
+        name = self._skill_names.get(skill_id)
+        if user_id not in self._users or name is None:
+            return
+        skills = self._user_skills.setdefault(user_id, [])
+        if skill_id in skills:
+            return
+        skills.append(skill_id)
+        for token in tokenize(name):
+            self._index_token(user_id, SKILL, token)
+
+    def _refresh(self, cursor) -> None:
+        cursor.execute("SELECT id, name, email FROM users WHERE id > %s ORDER BY id",
+                       (max(self._users_watermark - REFRESH_OVERLAP_ROWS, 0),))
+        for user_id, name, email in cursor.fetchall():
+            self._add_user(user_id, name, email)
+            self._users_watermark = max(self._users_watermark, user_id)
+
+        for table, attr in (('user_skills_offered', '_offered_watermark'),
+                            ('user_skills_wanted', '_wanted_watermark')):
+            watermark = getattr(self, attr)
+            cursor.execute(f"SELECT id, user_id, skill_id FROM {table} WHERE id > %s ORDER BY id",
+                           (max(watermark - REFRESH_OVERLAP_ROWS, 0),))
+            for row_id, user_id, skill_id in cursor.fetchall():
+                self._add_user_skill(user_id, skill_id)
+                watermark = max(watermark, row_id)
+            setattr(self, attr, watermark)
+
+    def _load_new_skills(self, cursor) -> bool:
+        """Add catalog entries created since the last sync; False if a known skill was deleted"""
+        cursor.execute("SELECT id, name FROM skills WHERE id > %s", (max(self._skill_names, default=0),))
+        self._skill_names.update(cursor.fetchall())
+        cursor.execute("SELECT COUNT(*) FROM skills")
+        return cursor.fetchone()[0] == len(self._skill_names)
+
+    def sync(self, cursor) -> None:
+        """Bring the index up to date; free when no user or skill write happened since the last sync"""
+        skills_version = self._versions.get('skills')
+        users_version = self._versions.get('users')
+        profiles_version = self._versions.get('profiles')
+        with self._lock:
+            # Renames and skill deletions change existing postings: start over rather than diffing
+            if (not self._loaded or users_version != self._users_version
+                    or (skills_version != self._skills_version and not self._load_new_skills(cursor))):
+                self._reset()
+                cursor.execute("SELECT id, name FROM skills")
+                self._skill_names = dict(cursor.fetchall())
+                self._refresh(cursor)
+                self._loaded = True
+            elif skills_version != self._skills_version or profiles_version != self._profiles_version:
+                self._refresh(cursor)
+            self._skills_version = skills_version
+            self._users_version = users_version
+            self._profiles_version = profiles_version
+
+    def _vocabulary_matches(self, term: str) -> Set[str]:
+        """Indexed tokens containing term (prefix-only for one- and two-character terms)"""
+        # Only trigrams for longer terms: a prefix key would limit matches to tokens starting with term
+        keys = trigrams(term) if len(term) >= 3 else {term}
+        token_sets = []
+        for key in keys:
+            tokens = self._gram_tokens.get(key)
+            if not tokens:
+                return set()
+            token_sets.append(tokens)
+        token_sets.sort(key=len)
+        tokens = set(token_sets[0])
+        for other in token_sets[1:]:
+            tokens &= other
+        return {token for token in tokens if term in token}
+
+    def _term_tiers(self, term: str) -> List[Tuple[int, Set[int]]]:
+        """Disjoint (score, users) tiers for one term, best score first; each user keeps its best field"""
+        by_score: Dict[int, List[Set[int]]] = {}
+        for token in self._vocabulary_matches(term):
+            for field in (NAME, SKILL, EMAIL):
+                users = self._token_users.get((field, token))
+                if users:
+                    by_score.setdefault(term_score(token, term, field), []).append(users)
+
+        tiers = []
+        seen: Set[int] = set()
+        for score in sorted(by_score, reverse=True):
+            tier = set().union(*by_score[score])
+            tier -= seen
+            if tier:
+                tiers.append((score, tier))
+                seen |= tier
+        return tiers
+
+    def _result(self, user_id: int) -> Dict[str, Any]:
+        name, email = self._users[user_id]
+        return {
+            'id': user_id,
+            'name': name,
+            'email': email,
+            'skills': [self._skill_names[s] for s in self._user_skills.get(user_id, ()) if s in self._skill_names]
+        }
+
+    def _page(self, tiers: List[Set[int]], offset: int, limit: int) -> List[int]:
+        """Ids at [offset, offset + limit) of the tiers in order, each tier ordered by name then id"""
+        page = []
+        skip = offset
+        for tier in tiers:
+            if skip >= len(tier):
+                skip -= len(tier)
+                continue
+            ordered = heapq.nsmallest(skip + limit - len(page), tier, key=self._sort_keys.__getitem__)
+            page.extend(ordered[skip:])
+            skip = 0
+            if len(page) >= limit:
+                break
+        return page[:limit]
+
+    def search(self, query: str, limit: int, offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """One page of users matching every query token, best matches first.
+
+        Returns (users, next_offset); next_offset is None on the last page.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not terms:
+                # Empty query lists everyone by name, still one page at a time
+                if self._by_name is None:
+                    self._by_name = sorted(self._sort_keys.values())
+                page = [uid for _, uid in self._by_name[offset:offset + limit]]
+                total = len(self._by_name)
+            else:
+                term_tiers = [self._term_tiers(term) for term in terms]
+                if len(term_tiers) == 1:
+                    tiers = [users for _, users in term_tiers[0]]
+                else:
+                    tiers = self._combine(term_tiers)
+                page = self._page(tiers, offset, limit)
+                total = sum(len(users) for users in tiers)
+
+            next_offset = offset + limit if offset + limit < total else None
+            return [self._result(uid) for uid in page], next_offset
+
+    @staticmethod
+    def _combine(term_tiers: List[List[Tuple[int, Set[int]]]]) -> List[Set[int]]:
+        """Users matching every term, tiered by summed score; only the intersection is visited"""
+        term_tiers = sorted(term_tiers, key=lambda tiers: sum(len(users) for _, users in tiers))
+        matches = set().union(*(users for _, users in term_tiers[0]))
+        for tiers in term_tiers[1:]:
+            matches &= set().union(*(users for _, users in tiers))
+            if not matches:
+                return []
+
+        totals: Dict[int, int] = dict.fromkeys(matches, 0)
+        for tiers in term_tiers:
+            for score, users in tiers:
+                for user_id in users & matches:
+                    totals[user_id] += score
+
+        by_total: Dict[int, Set[int]] = {}
+        for user_id, score in totals.items():
+            by_total.setdefault(score, set()).add(user_id)
+        return [by_total[score] for score in sorted(by_total, reverse=True)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'skills': len(self._skill_names),
+                'vocabulary': len(self._token_users),
+                'postings': sum(len(users) for users in self._token_users.values())
+            }
+
+# Global user search index instance
+user_search_index = UserSearchIndex()